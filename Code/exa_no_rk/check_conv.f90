@@ -16,6 +16,7 @@
       real :: dro_max, drovx_max, drovy_max, droe_max, dro_avg, drovx_avg, &
           drovy_avg, droe_avg, flow_ratio
       character(len=100) :: fmt_step
+      character(len=20) :: form
 
 !     Get the number of cells from the size of the residual arrays
       ncells = size(g%dro)
@@ -44,9 +45,16 @@
       end if
 
 !     Write the average and maximum changes in the primary variables to unit 3
-!     for convergenge plotting
-      write(3,'(i13,8e15.6)') av%nstep, dro_avg, droe_avg, drovx_avg, &
-          drovy_avg, dro_max, droe_max, drovx_max, drovy_max
+!     for convergenge plotting, either as a line of text or as a fixed length
+!     binary record depending on how the file has been opened
+      inquire(unit=3,form=form)
+      if(form == 'FORMATTED') then
+          write(3,'(i13,8e15.6)') av%nstep, dro_avg, droe_avg, drovx_avg, &
+              drovy_avg, dro_max, droe_max, drovx_max, drovy_max
+      else
+          write(3) av%nstep, dro_avg, droe_avg, drovx_avg, drovy_avg, &
+              dro_max, droe_max, drovx_max, drovy_max
+      end if
 
 !     Write a short human readable output summary to the screen.
       if(mod(av%nstep,1000) == 0) then
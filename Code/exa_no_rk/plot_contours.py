@@ -15,19 +15,17 @@ def main():
     inname = 'input_' + sys.argv[-1] + '.txt'
     outname = 'out_final_' + sys.argv[-1] + '.bin'
 
-    # Read the settings and the case from file
+    # Read the settings and the case from file, the secondary variables are 
+    # calculated by "calc_secondary" within "routines.py" and cached on disk so
+    # repeated runs of this script skip the reading and calculation
     av = read_settings(inname)
-    g = read_case(outname)
+    g = read_cached(outname,av)
 
     # When presenting results all values should be non-dimensionalised. Two
     # variables of interest might be:
     #    1. Static pressure coefficient, (p - p_ref) / (pstag_ref - p_ref)
     #    2. Mach number, v / (ga * rgas * t)**0.5
 
-    # First complete the "calc_secondary" function within "routines.py" to
-    # calculate static pressure and Mach number, and any others you want!
-    g = calc_secondary(av,g)    
-
     # Use the "cut_i", "mass_av" AND "area_av" functions to calculate the
     # reference pressures at the inlet plane and therefore the static pressure
     # coefficient
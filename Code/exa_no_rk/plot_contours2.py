@@ -15,21 +15,23 @@ def main():
     inname = 'input_' + sys.argv[-1] + '.txt'
     outname = 'out_final_' + sys.argv[-1] + '.bin'
 
-    # Read the settings and the case from file
+    # Read the settings and the case from file, the secondary variables are 
+    # calculated by "calc_secondary" within "routines.py" and cached on disk so
+    # repeated runs of this script skip the reading and calculation
     av = read_settings(inname)
-    g = read_case(outname)
+    g = read_cached(outname,av)
 
     # When presenting results all values should be non-dimensionalised. Two
     # variables of interest might be:
     #    1. Static pressure coefficient, (p - p_ref) / (pstag_ref - p_ref)
     #    2. Mach number, v / (ga * rgas * t)**0.5
 
-    # First complete the "calc_secondary" function within "routines.py" to
-    # calculate static pressure and Mach number, and any others you want!
-    g = calc_secondary(av,g)
-
-    g = read_case('out_unste_00079.bin')
-    g = calc_secondary(av,g)
+    # Unsteady frame to plot, the solver writes the frames and the mesh they
+    # share into the blowdown folder but a copy in this directory is used first
+    framename = 'out_unste_00079.bin'
+    if os.path.exists(framename) == False:
+        framename = os.path.join('tunnel_blowdown',framename)
+    g = read_cached(framename,av)
 
     # Use the "cut_i", "mass_av" AND "area_av" functions to calculate the
     # reference pressures at the inlet plane and therefore the static pressure
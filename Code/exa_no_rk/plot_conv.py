@@ -4,19 +4,29 @@
 #   Script to plot convergence history of a run executed using the 4A2 solver
 #
 #   Change to the directory you want to execute the script within and execute 
-#   with "python path_to_script/plot_conv.py casename"
+#   with "python path_to_script/plot_conv.py casename", or with
+#   "python path_to_script/plot_conv.py --live casename" to keep the plot 
+#   updating while the solver is running
 
 # Import modules and functions
 from routines import *
 
 def main():
 
-    # Construct full filenames to read the guess data
+    # Construct full filenames to read the guess data, use the binary log if it
+    # was written more recently than the text one
     filename = 'conv_' + sys.argv[-1] + '.csv'
+    binname = 'conv_' + sys.argv[-1] + '.bin'
+    if os.path.exists(binname) and (not os.path.exists(filename) or 
+        os.path.getmtime(binname) > os.path.getmtime(filename)):
+        filename = binname
 
     # Read the history from file
     l = read_conv(filename)
 
+    # Check whether to keep reading the history as it is written
+    live = '--live' in sys.argv[1:-1]
+
     # Open figure window for all residual data
     plt.figure(figsize=[9.6,7.2]); ax = plt.axes(); cols = gen_cols();
     ax.set_xlabel('Iteration'); ax.set_ylabel('Residual');
@@ -33,13 +43,28 @@ def main():
     colnames = ['dro', 'droe', 'drovx', 'drovy']
 
     # Plot the residuals changing with time
+    lines = []
     for m in range(len(fieldnames)):
         for n,name in enumerate(fieldnames[m]):
-            ax.plot(l['nstep'],l[name],color=cols[n,:])
+            lines.append(ax.plot(l['nstep'],l[name],color=cols[n,:])[0])
 
     # Add the legend for colours which are shared for max and average residuals
     ax.legend(colnames)
 
+    # In live mode read only the newly appended rows on a timer and update the
+    # data of the existing lines, the figure is only redrawn if rows were added
+    if live == True:
+        def update():
+            nrow = l['nrow']
+            read_conv(filename,l)
+            if l['nrow'] > nrow:
+                for line,name in zip(lines,fieldnames[0] + fieldnames[1]):
+                    line.set_data(l['nstep'],l[name])
+                ax.relim(); ax.autoscale_view();
+                ax.figure.canvas.draw_idle()
+        timer = ax.figure.canvas.new_timer(interval=2000)
+        timer.add_callback(update); timer.start();
+
     # Show all the plots
     plt.show()
 
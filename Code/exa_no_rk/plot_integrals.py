@@ -0,0 +1,70 @@
+#
+#   plot_integrals
+#
+#   Script to calculate and plot time series of the inlet and outlet mass flow
+#   rates, pressures and stagnation temperature ratio of an unsteady run from
+#   the 4A2 solver, the series is also saved to "integrals_casename.csv"
+#
+#   Change to the directory you want to execute the script within and execute
+#   with "python path_to_script/plot_integrals.py casename", or with
+#   "python path_to_script/plot_integrals.py --npz casename" to save the series
+#   to a compressed numpy archive instead
+
+# Import modules and functions
+from routines import *
+
+def main():
+
+    # Construct full filenames to read the run data
+    inname = 'input_' + sys.argv[-1] + '.txt'
+    av = read_settings(inname)
+
+    # Find the unsteady frames in order
+    folder = 'tunnel_blowdown'
+    files = sorted(glob.glob(os.path.join(folder,'out_unste_*.bin')))
+    if len(files) == 0:
+        print(f'No unsteady frames found in {folder}')
+        return
+
+    # Calculate the integral quantities of every frame one at a time, using
+    # all of the cores
+    s = integral_series(files,av,workers=None)
+
+    # Save the time series
+    if '--npz' in sys.argv[1:-1]:
+        outname = 'integrals_' + sys.argv[-1] + '.npz'
+    else:
+        outname = 'integrals_' + sys.argv[-1] + '.csv'
+    write_series(outname,s)
+    print(f'Integral quantities of {len(files)} frames saved to {outname}')
+
+    # Plot against time if it has been recorded, otherwise the frame number
+    if 't_tot' in s:
+        t = s['t_tot']; tname = 'Time / s';
+    else:
+        t = np.arange(len(files)); tname = 'Frame number';
+
+    # Pairs of inlet and outlet values to plot on each axis
+    varnames = [['mdot_in','mdot_out'],['pstag_in','pstag_out'],
+        ['p_in','p_out'],['tstag_ratio','mdot_ratio']]
+    labnames = ['Mass flow rate / kg/s','Stagnation pressure / Pa',
+        'Static pressure / Pa','Outlet to inlet ratio']
+
+    # Open figure window with an axis for each pair
+    fig,axs = plt.subplots(2,2,figsize=[12.8,9.6],sharex=True)
+    cols = gen_cols()
+    for ax,names,labname in zip(axs.flat,varnames,labnames):
+        for n,name in enumerate(names):
+            ax.plot(t,s[name],color=cols[n,:],label=name)
+        ax.set_ylabel(labname); ax.legend();
+        ax.tick_params(direction='in',which='both')
+    for ax in axs[1,:]:
+        ax.set_xlabel(tname)
+    fig.tight_layout()
+
+    # Show all the plots
+    plt.show()
+
+main()
+
+
@@ -0,0 +1,68 @@
+#
+#   plot_live
+#
+#   Script to plot the unsteady flowfield from the 4A2 solver while it is still
+#   running, each new frame is shown as soon as it has been written
+#
+#   Change to the directory you want to execute the script within and execute
+#   with "python path_to_script/plot_live.py casename" in a second terminal
+#   after starting the solver
+
+# Import modules and functions
+from routines import *
+
+def main():
+
+    # Construct full filenames to read the run data
+    inname = 'input_' + sys.argv[-1] + '.txt'
+    av = read_settings(inname)
+
+    # Folder containing the unsteady frames, stop following it once no new
+    # frames have been written for this many seconds
+    folder = 'tunnel_blowdown'
+    timeout = 60
+
+    # Open figure window
+    plt.ion()
+    fig = plt.figure(figsize=[9.6,7.2]); ax = plt.axes();
+    ax.set_aspect('equal',adjustable='box'); ax.axis('off')
+
+    # Plot each frame as it appears, the mesh is only read once it exists and
+    # the secondary variables of every frame are calculated in one workspace
+    hc = None; m = None; w = {}; mach_max = 0;
+    for filename in follow_frames(folder,timeout=timeout):
+
+        # Read the new frame and calculate the Mach number
+        if m is None:
+            m = read_frame_mesh(folder)
+        g = calc_secondary_ws(av,read_frame(filename,m),w)
+
+        # Create the plot on the first frame and only update it afterwards
+        if hc is None:
+            hc = ax.pcolormesh(g['x'],g['y'],g['mach'],shading='gouraud',
+                vmin=0,vmax=2.0)
+            colorbar(hc,'Mach number')
+            plot_wall(ax,g)
+        else:
+            hc.set_array(g['mach'])
+
+        # Keep a running maximum of the Mach number as a simple statistic
+        mach_max = max(mach_max,np.max(g['mach']))
+
+        # Show the time of the frame if it has been recorded
+        if 't_tot' in g:
+            ax.set_title(f"t = {g['t_tot']:.4e} s, max Mach = {mach_max:.3f}")
+        else:
+            ax.set_title(f'{os.path.basename(filename)}, max Mach = {mach_max:.3f}')
+
+        # Redraw the figure without blocking
+        plt.pause(0.01)
+
+    # Keep the final frame open
+    plt.ioff()
+    plt.show()
+
+
+main()
+
+
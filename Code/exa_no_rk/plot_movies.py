@@ -10,9 +10,13 @@
 import sys
 import os
 import glob
+import shutil
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+import contextlib
+import tempfile
+import concurrent.futures
+from matplotlib import animation
 from routines import *
 
 # Function to process files and generate movies
@@ -24,8 +28,7 @@ def generate_movies():
 
     # Reference pressures are calculated only once and use the final values
     outname = 'out_final_' + sys.argv[-1] + '.bin'
-    g = read_case(outname)
-    g = calc_secondary(av, g)
+    g = read_cached(outname, av)
     g_inlet = cut_i(g, 0)
     g_outlet = cut_i(g, -1)
     pstag_ref, _ = mass_av(g_inlet, 'pstag')
@@ -52,129 +55,212 @@ def generate_movies():
     # fieldnames = ['mach']
     # colnames = ['Mach number']
     
-    # Only preload every n-th frame
+    # Only render every n-th frame
     n = 1  # Modify this to control how many frames to skip
 
-    # Preload every n-th frame
-    for field_idx, (current_field, current_colname) in enumerate(zip(fieldnames, colnames)):
-
-        frames_data = []
-        print(f"Preloading frames for {current_field}...")
-
-        for idx, file in enumerate(files):
-            if idx % n == 0:  # Only load every n-th frame
-                g = read_case(file)
-
-                # Calculate secondary variables
-                g = calc_secondary(av, g)
-
-                # g['cp'] = (g['p'] - p_ref)/(pstag_ref-p_ref)
-                # g['cpstag'] = (g['pstag'] - pstag_ref)/(pstag_ref-p_ref)
-                # For the tunnel case normalise just by p_ref_out = 1atm
-                # Because pstag_ref and p_ref are almost identical at the end
-                # So small errors appear blown out of proportion
-                g['cp'] = (g['p'] - p_ref)/(p_ref_out)
-                g['cpstag'] = (g['pstag'] - pstag_ref)/(p_ref_out)
-
-                frames_data.append(g)
-
-        print(f"Preloaded {len(frames_data)} frames for {current_field}.")
-
-        # Create a figure for animation
-        fig, ax = plt.subplots(figsize=[9.6, 7.2], dpi=80)
-        ax.set_aspect('equal', adjustable='box')
-        ax.axis('off')
-
-        # Plot the walls only once (static)
-        plot_wall(ax, g)
-
-        # Placeholder for the color mesh and contour lines
-        hc = None
-        contour_lines = None
-
-        # Function to initialize the animation
-        def init():
-            ax.set_aspect('equal', adjustable='box')
-            ax.axis('off')
-            return []
-
-        # Function to update each frame
-        def update(frame_idx):
-            nonlocal hc, contour_lines
+    # Draw the fields with the lookup table rasteriser instead of a gouraud
+    # pcolormesh. It is opt-in, as at the default resolution it is not faster,
+    # its tables take ~32 bytes per pixel and it interpolates the values rather
+    # than the colours of the mesh
+    rasterise = False
+
+    # Number of processes rendering the frames, with more than one each renders
+    # a chunk of the frames to a short movie in a temporary folder and these are
+    # joined into the movies in order afterwards, None uses all cores
+    processes = 1
+
+    # Number of threads reading the frames and calculating their secondary 
+    # variables ahead of the rendering, None uses all cores
+    threads = None
+
+    # Keep the secondary variables of every frame on disk with "read_cached", so
+    # later runs skip reading and calculating them, or set False to calculate
+    # them in the reused workspaces of "calc_secondary_ws" without a cache
+    cache = True
+
+    # Stream an mp4 movie straight to ffmpeg if it is installed, otherwise 
+    # fall back to a GIF at a reduced size, which is held in memory until it is
+    # finished. The resolution is the same as saving the figure
+    use_ffmpeg = shutil.which('ffmpeg') is not None
+    if use_ffmpeg:
+        ext = '.mp4'; size = [8, 6]
+    else:
+        print("ffmpeg is not available, falling back to GIF format...")
+        ext = '.gif'; size = [6.4, 4.8]
+    dpi = plt.rcParams['savefig.dpi']
+
+    # Settings shared by every process that renders frames
+    files = files[::n]
+    refs = [p_ref, pstag_ref, p_ref_out]
+    settings = [av, folder, refs, fieldnames, colnames, size, dpi, rasterise, cache, use_ffmpeg]
+    outnames = {f: f'bump_ramp__movie_{f}' + ext for f in fieldnames}
+
+    # Render in parallel if requested
+    if processes is None:
+        processes = os.cpu_count()
+    if processes > 1:
+
+        # Split the frames into one contiguous chunk per process, each renders
+        # its chunk to a segment of every movie in a temporary folder, named 
+        # with the number of the first frame of the chunk in the whole movie. 
+        # Every process reads its frames with a single thread
+        with tempfile.TemporaryDirectory() as outdir:
+            chunks = np.array_split(np.arange(len(files)), processes)
+            jobs = [[files[c[0]:c[-1]+1], c[0], 
+                {f: os.path.join(outdir, f'{f}_{c[0]:05d}' + ext) for f in fieldnames}, 1]
+                + settings for c in chunks if len(c) > 0]
+            with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+                list(pool.map(render_frames, jobs))
+
+            # Join the segments of each field into a movie in order
+            for current_field in fieldnames:
+                segments = [job[2][current_field] for job in jobs]
+                assemble_movie(segments, outnames[current_field], fps=10)
+
+    # Otherwise render all of the frames in this process
+    else:
+        render_frames([files, 0, outnames, threads] + settings)
+
+    for current_field in fieldnames:
+        print(f"Movie for {current_field} saved as {outnames[current_field]}")
+
+# Function to render a list of frames, numbered from "start", to a movie of 
+# every field
+def render_frames(job):
+
+    files, start, outnames, threads, av, folder, refs, fieldnames, colnames, size, dpi, rasterise, cache, use_ffmpeg = job
+
+    # Read the mesh once if it is shared between all of the frames
+    m = read_frame_mesh(folder)
+
+    # Open a figure and a movie writer for every field, all of the movies are
+    # written together so each frame is only read and processed once
+    with contextlib.ExitStack() as stack:
+
+        movies = []
+        for current_field, current_colname in zip(fieldnames, colnames):
+
+            # Create a figure for the movie
+            mv = create_movie(current_field, current_colname, size, rasterise)
+
+            # Start writing the movie, streamed to ffmpeg or held in memory as a
+            # GIF until it is finished
+            output_video = outnames[current_field]
+            if use_ffmpeg:
+                mv['writer'] = stack.enter_context(MovieWriter(
+                    mv['fig'], output_video, fps=10, dpi=dpi, extra_args=['-vcodec', 'mpeg4']
+                ))
+            else:
+                mv['writer'] = animation.PillowWriter(fps=10)
+                stack.enter_context(mv['writer'].saving(mv['fig'], output_video, dpi))
+            movies.append(mv)
+
+        # Read and process each frame once in the pool of threads, from the 
+        # cache or reusing the workspaces of earlier frames, and add it to every
+        # movie
+        frames = prefetch_frames(
+            lambda filename, w: process_frame(av, filename, m, w, refs, cache), files, threads
+        )
+        for frame_idx, g in enumerate(frames, start):
 
             # Print a counter so that progress can be monitored
             print(frame_idx)
 
-            # Get the preloaded frame
-            g = frames_data[frame_idx]
-
-            # Determine vmin and vmax based on the field
-            if current_field == 'cp':
-                vmin, vmax = -1.4, 0.4
-            elif current_field == 'mach':
-                vmin, vmax = 0, 2.0  # Typical Mach number range
-            elif current_field == 'cpstag':
-                vmin, vmax = -0.5, 0.1
-            else:
-                vmin, vmax = None, None  # Auto-scale if undefined
-
-            # Clear the axis for dynamic content, but not the walls
-            ax.clear()
-            ax.set_aspect('equal', adjustable='box')
-            ax.axis('off')
-
-            # Plot the color mesh with fixed scale
-            hc = ax.pcolormesh(
-                g['x'], g['y'], g[current_field], shading='gouraud', vmin=vmin, vmax=vmax
-            )
-            colorbar(hc, current_colname)
-            
-            # Add Mach = 1 contour only if levels exist in the range
-            if current_field == 'mach' and np.min(g['mach']) <= 1.0 <= np.max(g['mach']):
-                ax.contour(g['x'], g['y'], g['mach'], [1.0], colors='w', linewidths=0.5)
-
-                
-            '''
-            # Add cpstag contours only if data range supports it
-            if current_field == 'cpstag' and np.min(g['cpstag']) < 2 and np.max(g['cpstag']) > -2:
-                levels = np.arange(-2, 2, 0.02)
-                contour_lines = ax.contour(g['x'], g['y'], g['cpstag'], levels=levels, colors='w', linewidths=0.5)
-                ax.clabel(contour_lines, inline=False, fontsize=8)
-            '''
-
-            return [hc, contour_lines] if contour_lines else [hc]
-
-        # Number of frames is the total number of preloaded frames
-        num_frames = len(frames_data)
-
-        ani = FuncAnimation(fig, update, frames=num_frames, init_func=init, blit=False)
-
-        try:
-            output_video = f'bump_ramp__movie_{current_field}'
-
-            # Adjust figure size and layout
-            fig.set_size_inches(8, 6)  # Set to reasonable dimensions
-            fig.tight_layout()  # Prevent label overlap
-
-            ani.save(output_video+'.mp4', fps=10, extra_args=['-vcodec', 'mpeg4'])
-            print(f"Movie for {current_field} saved as {output_video}.mp4")
-        except Exception as e:
-            print(f"Failed to save {current_field} as MP4 due to: {e}")
-            print("Falling back to GIF format...")
-
-            # Reduce resolution for GIF saving
-            fig.set_size_inches(6.4, 4.8)  # Smaller figure size
-            ani.save(output_video+'.gif', fps=10, writer='pillow')
-            print(f"Movie for {current_field} saved as {output_video}.gif")
-
-        # Close the figure to free memory
-        plt.close(fig)
-
-# Call the function
-generate_movies()
-
-
-
-
+            # Draw the frame and add it to every movie
+            for mv in movies:
+                draw_frame(mv, g)
+                mv['writer'].grab_frame()
+
+    # Close the figures to free memory
+    for mv in movies:
+        plt.close(mv['fig'])
+
+# Function to read a frame and calculate the variables to plot
+def process_frame(av, filename, m, w, refs, cache):
+
+    p_ref, pstag_ref, p_ref_out = refs
+
+    # Read the frame and its secondary variables from the cache, or calculate 
+    # them in place in the workspace
+    if cache:
+        g = read_cached(filename, av, m)
+    else:
+        g = calc_secondary_ws(av, read_frame(filename, m), w)
+
+    # g['cp'] = (g['p'] - p_ref)/(pstag_ref-p_ref)
+    # g['cpstag'] = (g['pstag'] - pstag_ref)/(pstag_ref-p_ref)
+    # For the tunnel case normalise just by p_ref_out = 1atm
+    # Because pstag_ref and p_ref are almost identical at the end
+    # So small errors appear blown out of proportion
+    g['cp'] = (g['p'] - p_ref)/(p_ref_out)
+    g['cpstag'] = (g['pstag'] - pstag_ref)/(p_ref_out)
+
+    return g
+
+# Function to create the figure of a movie
+def create_movie(current_field, current_colname, size, rasterise):
+
+    # Fixed colour scale of each field
+    limits = {'mach': [0, 2.0], 'cp': [-1.4, 0.4], 'cpstag': [-0.5, 0.1]}
+
+    # Create a figure for the movie
+    fig, ax = plt.subplots(figsize=[9.6, 7.2], dpi=80)
+    ax.set_aspect('equal', adjustable='box')
+    ax.axis('off')
+
+    # Adjust figure size and layout
+    fig.set_size_inches(size)  # Set to reasonable dimensions
+    fig.tight_layout()  # Prevent label overlap
+
+    # The color mesh and contour lines are created on the first frame
+    return {'field': current_field, 'colname': current_colname, 'fig': fig, 
+        'ax': ax, 'limits': limits[current_field], 'hc': None, 'contour_lines': None,
+        'rasterise': rasterise}
+
+# Function to draw a single frame of a field
+def draw_frame(mv, g):
+
+    ax = mv['ax']; current_field = mv['field']; vmin, vmax = mv['limits'];
+
+    # Plot the color mesh with fixed scale, the walls and the colorbar only on
+    # the first frame and just update the values of the color mesh after that
+    if mv['hc'] is None and mv['rasterise'] == False:
+        mv['hc'] = ax.pcolormesh(
+            g['x'], g['y'], g[current_field], shading='gouraud', vmin=vmin, vmax=vmax
+        )
+        colorbar(mv['hc'], mv['colname'])
+        plot_wall(ax, g)
 
+    # Or draw the field with the lookup table rasteriser, the limits are fixed 
+    # to the mesh first so the pixels of every frame stay the same
+    elif mv['hc'] is None:
+        ax.axis([np.min(g['x']), np.max(g['x']), np.min(g['y']), np.max(g['y'])])
+        mv['hc'] = RasterField(ax, g, g[current_field], vmin, vmax)
+        colorbar(plt.cm.ScalarMappable(plt.Normalize(vmin, vmax), 'viridis'),
+            mv['colname'], ax)
+        plot_wall(ax, g)
+    else:
+        mv['hc'].set_array(g[current_field])
 
+    # Remove the Mach = 1 contour of the previous frame
+    if mv['contour_lines'] is not None:
+        mv['contour_lines'].remove()
+        mv['contour_lines'] = None
+    
+    # Add Mach = 1 contour only if levels exist in the range
+    if current_field == 'mach' and np.min(g['mach']) <= 1.0 <= np.max(g['mach']):
+        mv['contour_lines'] = ax.contour(
+            g['x'], g['y'], g['mach'], [1.0], colors='w', linewidths=0.5
+        )
+
+    '''
+    # Add cpstag contours only if data range supports it
+    if current_field == 'cpstag' and np.min(g['cpstag']) < 2 and np.max(g['cpstag']) > -2:
+        levels = np.arange(-2, 2, 0.02)
+        contour_lines = ax.contour(g['x'], g['y'], g['cpstag'], levels=levels, colors='w', linewidths=0.5)
+        ax.clabel(contour_lines, inline=False, fontsize=8)
+    '''
+
+# Call the function, only in the main process
+if __name__ == '__main__':
+    generate_movies()
@@ -12,31 +12,30 @@ import numpy as np
 import matplotlib.pyplot as plt
 import os
 import glob
-from routines import read_case, calc_secondary
+from routines import read_frames, FlowField
 
-def load_mach_frames(file_list, av):
+def load_mach_frames(file_pattern, av, workers=None):
     """
-    Load only Mach number data for all frames from the provided list of files.
-    Returns a list of Mach arrays
+    Load the centerline Mach number for all frames matching the file pattern.
+    Returns a (nframes, ni) array of Mach number and the frame times, the times
+    are None if the files were written without a header. The frames are read
+    by a pool of "workers" threads, None uses all cores
     """
-    mach_data_list = []
-    nj = None
+    # Read the primary variables of all frames into stacked arrays
+    g = read_frames(file_pattern, ['ro', 'roe', 'rovx', 'rovy'], workers=workers)
 
-    for file in file_list:
-        # Read the data for the current frame
-        g = read_case(file)
-        g = calc_secondary(av, g)  # Calculate secondary variables like Mach
+    # Calculate centerline index
+    nj = g['nj']
+    centerline_idx = (nj + 1) // 2 - 1  # Zero-based centerline index
+    x_coords = g['x'][:,centerline_idx]
 
-        # Store only the Mach field
-        mach_data_list.append(g['mach'])
+    # Calculate the Mach number for every frame at once on the centerline only,
+    # none of the other secondary variables are needed
+    c = FlowField(av, {})
+    for name in ['ro', 'roe', 'rovx', 'rovy']:
+        c[name] = g[name][:, :, centerline_idx]  # Fixed j, varying i
 
-        if nj is None:
-            # Calculate centerline index
-            nj = g['nj']
-            centerline_idx = (nj + 1) // 2 - 1  # Zero-based centerline index
-            x_coords = g['x'][:,centerline_idx]
-
-    return mach_data_list, x_coords, centerline_idx
+    return c['mach'], g.get('t_tot'), x_coords, centerline_idx
 
 def generate_space_time_mach_plot():
     """
@@ -52,6 +51,9 @@ def generate_space_time_mach_plot():
     file_pattern = os.path.join(folder, 'out_unste_*.bin')
     files = sorted(glob.glob(file_pattern))
 
+    # Number of threads reading the frames, None uses all cores
+    workers = None
+
     # Construct full filenames to read the run data
     inname = 'input_' + sys.argv[-1] + '.txt'
     av = read_settings(inname)
@@ -62,32 +64,24 @@ def generate_space_time_mach_plot():
     
     print(f"Found {len(files)} files. Preloading Mach data...")
 
-    # User inputs
-    num_total_steps = int(input('Enter Total Timesteps: '))  # Total number of steps in the solution
-    timestep = 1.63889786E-06       # Time step per solution step
-    num_frames = 100        # Number of frames intended
-    num_files = len(files)   # Number of frames generated
-    # Less than num_frames if solver diverges early
-    
-    # Load Mach data, x_coords, and centerline index
-    mach_data, x_coords, centerline_idx = load_mach_frames(files, av)
-    
-    # Time array for the frames
-    end = timestep * num_total_steps * num_files / num_frames
-    frame_times = np.linspace(0, end, num_files)
+    # Load centerline Mach data, frame times, x_coords, and centerline index
+    centerline_mach, frame_times, x_coords, centerline_idx = load_mach_frames(file_pattern, av, workers)
+
+    # Files written without a header do not record their time, so reconstruct
+    # the time array for the frames from user inputs
+    if frame_times is None:
+        num_total_steps = int(input('Enter Total Timesteps: '))  # Total number of steps in the solution
+        timestep = 1.63889786E-06       # Time step per solution step
+        num_frames = 100        # Number of frames intended
+        num_files = len(files)   # Number of frames generated
+        # Less than num_frames if solver diverges early
+        end = timestep * num_total_steps * num_files / num_frames
+        frame_times = np.linspace(0, end, num_files)
 
     # Print shape of frame_times and x_coords
     print(f"Shape of frame_times: {frame_times.shape}")
     print(f"Shape of x_coords: {x_coords.shape}")
 
-    # Extract Mach data along the centerline
-    centerline_mach = []
-    for mach in mach_data:
-        centerline_mach.append(mach[:, centerline_idx])  # Fixed j, varying i
-    
-    # Convert to a 2D NumPy array
-    centerline_mach = np.array(centerline_mach)
-
     # Print shape of centerline Mach data
     print(f"Shape of centerline_mach: {centerline_mach.shape}")
 
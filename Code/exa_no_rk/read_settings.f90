@@ -28,6 +28,10 @@
       read(5,*) av%nsteps
       read(5,*) av%ni, av%nj
 
+!     Initialise the step count and solution time, these are written into the
+!     header of every output file
+      av%nstep = 0; av%t_tot = 0.0; av%dt = 0.0; av%frame_no = 0;
+
 !     Calculate other gas constants used throughout the calculation
       av%cp = av%rgas * av%gam / (av%gam - 1.0)
       av%cv = av%cp / av%gam
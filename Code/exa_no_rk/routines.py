@@ -6,7 +6,17 @@
 
 # Import modules and functions
 import sys
+import os
+import time
+import glob
+import json
+import shutil
+import hashlib
+import tempfile
+import subprocess
+import concurrent.futures
 import numpy as np
+import matplotlib.artist
 import matplotlib.pyplot as plt 
 import scipy.interpolate as interp
 
@@ -19,7 +29,9 @@ plt.rc('font',size=14); plt.rc('axes',titlesize=16); plt.rc('axes',labelsize=16)
 def calc_secondary(av,b):
     # Calculate secondary flow variables that you will need to inspect during
     # your post-processing, save them into the block "b" dictionary alongside
-    # mesh coordinates and primary flow variables.
+    # mesh coordinates and primary flow variables. Every operation is applied
+    # elementwise, so the primary variables may also have a leading frame axis
+    # as read by "read_frames" and a whole sequence is calculated at once.
 
     gm = av['gam']
     gm1 = gm - 1
@@ -45,23 +57,209 @@ def calc_secondary(av,b):
 
 ################################################################################
 
+def calc_secondary_ws(av,b,w,dtype=None):
+    # Calculate the same secondary flow variables as "calc_secondary" without 
+    # allocating any new arrays. The results and temporaries are held in the
+    # workspace dictionary "w", which is filled on the first call and reused
+    # by every call after with the same shape, so the results stored in "b" 
+    # are overwritten by the next call. The data type of the results is that 
+    # of the density unless "dtype" is set, e.g. to keep float32 throughout
+
+    # Allocate the workspace arrays if they do not exist or do not match
+    if dtype is None:
+        dtype = b['ro'].dtype
+    shape = np.shape(b['ro'])
+    for var in ['vx','vy','vsq','p','hstag','msq','mach','comp_term','tstag',
+        't','pstag','alpha','h','s','temp']:
+        if var not in w or w[var].shape != shape or w[var].dtype != dtype:
+            w[var] = np.empty(shape,dtype=dtype)
+
+    # Gas constants and local names for the primary variables
+    gm = av['gam']; gm1 = gm - 1; cp = av['cp'];
+    ro = b['ro']; roe = b['roe']; temp = w['temp'];
+
+    # Velocities
+    vx = np.divide(b['rovx'],ro,out=w['vx'])
+    vy = np.divide(b['rovy'],ro,out=w['vy'])
+    vsq = np.square(vx,out=w['vsq']); vsq += np.square(vy,out=temp);
+
+    # Static pressure and stagnation enthalpy
+    np.multiply(ro,vsq,out=temp); temp /= 2.0; np.subtract(roe,temp,out=temp);
+    p = np.multiply(gm1,temp,out=w['p'])
+    hstag = np.add(roe,p,out=w['hstag']); hstag /= ro;
+
+    # Mach number, assume ideal gas RT = p/ro
+    np.multiply(gm,p,out=temp); temp /= ro;
+    msq = np.divide(vsq,temp,out=w['msq'])
+    np.power(msq,0.5,out=w['mach'])
+    comp_term = np.multiply(gm1,msq,out=w['comp_term'])
+    comp_term /= 2; comp_term += 1.0;
+
+    # Stagnation and static temperatures and stagnation pressure
+    np.divide(hstag,cp,out=w['tstag'])
+    t = np.divide(w['tstag'],comp_term,out=w['t'])
+    np.power(comp_term,gm/gm1,out=temp); np.multiply(p,temp,out=w['pstag']);
+
+    # Flow angle
+    np.arctan2(vy,vx,out=w['alpha']); np.degrees(w['alpha'],out=w['alpha']);
+
+    # Static enthalpy and entropy, perfect gas assumption and reference entropy
+    # = 0 at (300K, 1bar)
+    np.multiply(cp,t,out=w['h'])
+    np.divide(t,300.0,out=temp); np.log(temp,out=temp); temp *= cp;
+    s = np.divide(p,100000.0,out=w['s']); np.log(s,out=s); s *= av['rgas'];
+    np.subtract(temp,s,out=s)
+
+    # Store the results in the block
+    for var in ['vx','vy','p','hstag','mach','tstag','t','pstag','alpha','h',
+        's']:
+        b[var] = w[var]
+
+    return b
+
+################################################################################
+
+# Secondary flow variables calculated lazily by "FlowField", each is stored with
+# the names of the variables it depends on and a function to calculate it from
+# the gas constants "av" and the block "b". The definitions are identical to 
+# those in "calc_secondary"
+secondary_vars = {
+    'vx': [['rovx','ro'], lambda av,b: b['rovx']/b['ro']],
+    'vy': [['rovy','ro'], lambda av,b: b['rovy']/b['ro']],
+    'vsq': [['vx','vy'], lambda av,b: b['vx']**2 + b['vy']**2],
+    'p': [['roe','ro','vsq'], lambda av,b: (av['gam'] - 1) * 
+        ( b['roe'] - (b['ro']*b['vsq']/2.0) )],
+    'hstag': [['roe','p','ro'], lambda av,b: (b['roe'] + b['p']) / b['ro']],
+    'msq': [['vsq','p','ro'], lambda av,b: b['vsq'] / 
+        (av['gam']*b['p']/b['ro'])],
+    'mach': [['msq'], lambda av,b: b['msq'] ** 0.5],
+    'comp_term': [['msq'], lambda av,b: 1.0 + (av['gam'] - 1)*b['msq']/2],
+    'tstag': [['hstag'], lambda av,b: b['hstag']/av['cp']],
+    't': [['tstag','comp_term'], lambda av,b: b['tstag'] / b['comp_term']],
+    'pstag': [['p','comp_term'], lambda av,b: b['p'] * b['comp_term'] ** 
+        (av['gam']/(av['gam'] - 1))],
+    'alpha': [['vy','vx'], lambda av,b: 
+        np.degrees(np.arctan2(b['vy'],b['vx']))],
+    'h': [['t'], lambda av,b: av['cp'] * b['t']],
+    's': [['t','p'], lambda av,b: av['cp'] * np.log(b['t']/300.0) - 
+        av['rgas'] * np.log(b['p']/100000.0)]}
+
+################################################################################
+
+class FlowField(dict):
+    # A block dictionary in which the secondary variables in "secondary_vars"
+    # are only calculated when they are first accessed, so only the work that
+    # is actually needed is done. Results are kept until a variable they depend
+    # on is assigned a new value, changing an array in place is not seen so 
+    # call "changed" with its name afterwards. Secondary variables count as in
+    # the dictionary once everything they depend on is, calculated or not
+
+    def __init__(self,av,b):
+        dict.__init__(self,b)
+        self.av = av
+
+    def __missing__(self,var):
+        # Calculate a secondary variable and any it depends on, then store it
+        if var not in secondary_vars:
+            raise KeyError(var)
+        dict.__setitem__(self,var,secondary_vars[var][1](self.av,self))
+        return dict.__getitem__(self,var)
+
+    def __setitem__(self,var,value):
+        # Store the value and forget all calculated variables that depend on it
+        dict.__setitem__(self,var,value)
+        self.changed(var)
+
+    def __contains__(self,var):
+        # Variables that are stored or that can be calculated from the block
+        if dict.__contains__(self,var):
+            return True
+        return var in secondary_vars and all([dvar in self for dvar in 
+            secondary_vars[var][0]])
+
+    def get(self,var,default=None):
+        if var in self:
+            return self[var]
+        return default
+
+    def changed(self,var):
+        # Forget all calculated variables that depend on a variable
+        stale = [var]
+        while len(stale) > 0:
+            name = stale.pop()
+            for dvar in secondary_vars:
+                if name in secondary_vars[dvar][0] and \
+                    dict.__contains__(self,dvar):
+                    dict.__delitem__(self,dvar); stale.append(dvar);
+
+################################################################################
+
+class Cut:
+    # A structured cut through a block along an "i = const" (axis 0) or 
+    # "j = const" (axis 1) line. Nothing is copied, indexing the cut returns a
+    # view of the block array at the line and the projected and total lengths 
+    # of the facets along the line are calculated once. Arrays may also have a
+    # leading frame axis. Values assigned to the cut are stored only in the cut
+
+    def __init__(self,b,axis,index):
+
+        # Store the block and the position of the cut. A negative index counts
+        # from the end of each array separately, as in the original "cut_i", so
+        # -1 is the last line of nodes and also the last line of cells
+        self.b = b; self.axis = axis; self.index = index;
+        self.c = {}
+
+        # Store the projected lengths of the facets in the cut direction and 
+        # the total lengths from the two components
+        if axis == 0:
+            self.c['lx'] = b['lx_i'][self.index,:]
+            self.c['ly'] = b['ly_i'][self.index,:]
+        else:
+            self.c['lx'] = b['lx_j'][:,self.index]
+            self.c['ly'] = b['ly_j'][:,self.index]
+        self.c['l'] = (self.c['lx']**2 + self.c['ly']**2)**0.5
+
+    def __getitem__(self,var):
+
+        # Values stored in the cut itself and scalars from the block
+        if var in self.c:
+            return self.c[var]
+
+        # Secondary variables that have not been calculated in the block yet
+        # are calculated on the cut only when they are needed
+        if isinstance(self.b,FlowField) and var in secondary_vars and \
+            dict.__contains__(self.b,var) == False:
+            self.c[var] = secondary_vars[var][1](self.b.av,self)
+            return self.c[var]
+
+        # View of the block array along the line
+        value = self.b[var]
+        if not isinstance(value,np.ndarray):
+            return value
+        elif self.axis == 0:
+            return value[...,self.index,:]
+        else:
+            return value[...,self.index]
+
+    def __setitem__(self,var,value):
+        self.c[var] = value
+
+    def __contains__(self,var):
+        return var in self.c or var in self.b
+
+################################################################################
+
 def cut_i(b,i):
     # Take a structured cut along an "i = const" line, this is done using Python
     # indexing that starts from 0
-    
-    # Loop over all variables in dict and extract at given i
-    c = {}
-    for var in b:
-        if isinstance(b[var],np.ndarray):
-            if i < np.shape(b[var])[0]:
-                c[var] = np.squeeze(b[var][i,:])
-        else:
-            c[var] = b[var]
+    return Cut(b,0,i)
 
-    # Store the projected lengths in the i-direction
-    c['lx'] = b['lx_i'][i,:]; c['ly'] = b['ly_i'][i,:];
+################################################################################
 
-    return c
+def cut_j(b,j):
+    # Take a structured cut along a "j = const" line, this is done using Python
+    # indexing that starts from 0
+    return Cut(b,1,j)
 
 ################################################################################
 
@@ -82,36 +280,83 @@ def cut_block(g,n):
 ################################################################################
 
 def area_av(c,prop):
-    # Calculate area average of a property over the whole cut
+    # Calculate area average of a property over the whole cut, a cut of stacked
+    # frames gives the average in each frame
 
-    # Calculate total side length from two projected components
-    l = (c['lx']**2 + c['ly']**2)**0.5
+    # Calculate total side length from two projected components, unless it is
+    # already stored in the cut
+    if 'l' in c:
+        l = c['l']
+    else:
+        l = (c['lx']**2 + c['ly']**2)**0.5
 
     # Area average of property
-    p = np.sum(face_av(c[prop]) * l) / np.sum(l) 
+    p = np.sum(face_av(c[prop],-1) * l,-1) / np.sum(l) 
 
     return p,l
 
 ################################################################################
 
 def mass_av(c,prop):
-    # Calculate mass average of a property over the whole cut
+    # Calculate mass average of a property over the whole cut, a cut of stacked
+    # frames gives the average in each frame
 
     # Calculate mass flow through each face
-    mass = face_av(c['rovx']) * c['lx'] + face_av(c['rovy']) * c['ly'] 
+    mass = face_av(c['rovx'],-1) * c['lx'] + face_av(c['rovy'],-1) * c['ly'] 
 
     # Mass average of property
-    p = np.sum(face_av(c[prop]) * mass) / np.sum(mass) 
+    p = np.sum(face_av(c[prop],-1) * mass,-1) / np.sum(mass,-1) 
 
     return p,mass
 
 ################################################################################
 
-def face_av(p):
-    # Calculate facet centred average of a value
+def area_av_all_i(b,props):
+    # Calculate area averages of one or more properties over every "i = const"
+    # line at once, returned as arrays of length ni in a dictionary, or with a
+    # leading frame axis if the frames are stacked
+
+    # Total side lengths of every i-facet
+    l = (b['lx_i']**2 + b['ly_i']**2)**0.5
+
+    # Area average of each property along every line
+    if isinstance(props,str):
+        props = [props]
+    p = {}
+    for prop in props:
+        p[prop] = np.sum(face_av(b[prop],-1) * l,-1) / np.sum(l,-1)
+
+    return p,l
+
+################################################################################
+
+def mass_av_all_i(b,props):
+    # Calculate mass averages of one or more properties over every "i = const"
+    # line at once, returned as arrays of length ni in a dictionary, or with a
+    # leading frame axis if the frames are stacked
+
+    # Calculate mass flow through every i-facet
+    mass = face_av(b['rovx'],-1) * b['lx_i'] + face_av(b['rovy'],-1) * b['ly_i']
+    mdot = np.sum(mass,-1)
+
+    # Mass average of each property along every line
+    if isinstance(props,str):
+        props = [props]
+    p = {}
+    for prop in props:
+        p[prop] = np.sum(face_av(b[prop],-1) * mass,-1) / mdot
+
+    return p,mass
+
+################################################################################
+
+def face_av(p,axis=0):
+    # Calculate facet centred average of a value, along the first axis unless
+    # another is given
 
     # Equal weighting of two nodes on a line
-    p_av = 0.5 * (p[1:] + p[:-1])
+    p = np.moveaxis(p,axis,0)
+    p_av = np.moveaxis(0.5 * (p[1:] + p[:-1]),0,axis)
 
     return p_av
 
@@ -477,14 +722,16 @@ def gen_cols():
 
 ################################################################################
 
-def colorbar(mappable,name):
-    # Generate a colorbar of the correct height
+def colorbar(mappable,name,ax=None):
+    # Generate a colorbar of the correct height, the axes must be given if the
+    # mappable has not been plotted on them
 
     # Import extra matplotlib toolkit
     from mpl_toolkits.axes_grid1 import make_axes_locatable
 
     # Parse the input to get both axes and figure handles
-    ax = mappable.axes
+    if ax is None:
+        ax = mappable.axes
     fig = ax.figure
 
     # Check the size of the axes to place the colorbar on the long edge
@@ -559,6 +806,261 @@ def plot_wall(ax,b,scale=True):
 
 ################################################################################
 
+class Rasteriser:
+    # Draw nodal fields of a fixed mesh directly as RGBA images. As in a 
+    # gouraud "pcolormesh" every cell is split into four triangles that meet at
+    # its centre and values are interpolated linearly within each triangle. The
+    # triangle and weights of every pixel are found once, so each image is only
+    # a gather of the four nodes of the cell under every pixel and a lookup of
+    # the colour in a table. Pixels outside of the mesh are left transparent
+
+    def __init__(self,b,extent,width,height,nrows=64):
+
+        # Import the triangulation tools
+        import matplotlib.tri as mtri
+
+        # Number the nodes of the mesh followed by the centres of the cells
+        x = np.asarray(b['x'],dtype=float); y = np.asarray(b['y'],dtype=float);
+        ni,nj = np.shape(x); nq = (ni-1) * (nj-1);
+        xp = np.concatenate([x.ravel(),cell_av(x).ravel()])
+        yp = np.concatenate([y.ravel(),cell_av(y).ravel()])
+
+        # Corners of every cell in order around it and the four triangles
+        # between each pair of neighbouring corners and the centre
+        i,j = np.meshgrid(np.arange(ni-1),np.arange(nj-1),indexing='ij')
+        i = i.ravel(); j = j.ravel();
+        corners = np.stack([i*nj + j,(i+1)*nj + j,(i+1)*nj + j+1,i*nj + j+1],-1)
+        centre = ni*nj + np.arange(nq)
+        tri = np.concatenate([np.stack([corners[:,k],corners[:,(k+1) % 4],
+            centre],-1) for k in range(4)])
+        t = mtri.Triangulation(xp,yp,tri)
+
+        # Centres of the pixels, the first row of the image is at the top
+        x_min,x_max,y_min,y_max = extent
+        xs = x_min + (np.arange(width) + 0.5) * (x_max - x_min) / width
+        ys = y_max - (np.arange(height) + 0.5) * (y_max - y_min) / height
+        finder = t.get_trifinder()
+
+        # Work through a block of rows at a time to limit the memory used while
+        # the weights are found, only those of the pixels inside are stored
+        nodes = []; ws = []; pix = [];
+        for r in range(0,height,nrows):
+
+            # Find the triangle under the centre of every pixel in the block
+            xr,yr = np.meshgrid(xs,ys[r:r+nrows])
+            n = finder(xr,yr).ravel(); inside = n >= 0;
+            n = n[inside]; xr = xr.ravel()[inside]; yr = yr.ravel()[inside];
+
+            # Barycentric weights of the two corners and centre of each triangle
+            v = tri[n]
+            x1,x2,x3 = xp[v[:,0]],xp[v[:,1]],xp[v[:,2]]
+            y1,y2,y3 = yp[v[:,0]],yp[v[:,1]],yp[v[:,2]]
+            det = (y2 - y3) * (x1 - x3) + (x3 - x2) * (y1 - y3)
+            l1 = ((y2 - y3) * (xr - x3) + (x3 - x2) * (yr - y3)) / det
+            l2 = ((y3 - y1) * (xr - x3) + (x1 - x3) * (yr - y3)) / det
+            l3 = 1 - l1 - l2
+
+            # Share the weight of the centre equally between the corners of the
+            # cell, so each pixel depends on the four nodes of its cell only
+            q = n % nq; k = n // nq;
+            w = np.repeat(l3[None,:] / 4,4,axis=0).astype(np.float32)
+            p = np.arange(len(n))
+            w[k,p] += l1; w[(k+1) % 4,p] += l2;
+            nodes.append(np.ascontiguousarray(corners[q].T,dtype=np.int32))
+            ws.append(w)
+            pix.append(np.flatnonzero(inside) + r * width)
+
+        # Store the nodes and weights of each corner contiguously, along with
+        # the index of every pixel inside the mesh in the flattened image
+        self.nodes = np.concatenate(nodes,axis=1)
+        self.w = np.concatenate(ws,axis=1)
+        self.pix = np.concatenate(pix)
+        self.mask = np.zeros([height,width],dtype=bool)
+        self.mask.flat[self.pix] = True
+
+        # Image that is filled in place by every call, also viewed as a single
+        # 32 bit integer per pixel so each colour is copied in one go
+        self.img = np.zeros([height,width,4],dtype=np.uint8)
+        self.img_flat = self.img.view(np.uint32).reshape(-1)
+        self.luts = {}
+
+        # Workspace for the values at the pixels inside the mesh
+        self.v = np.empty(len(self.pix),dtype=np.float32)
+        self.t = np.empty(len(self.pix),dtype=np.float32)
+
+    def render(self,p,vmin,vmax,cmap='viridis',ncol=256):
+        # Colour the values of a nodal array into the image, which is reused so
+        # is overwritten by the next call. Values are split into "ncol" equal 
+        # bins between "vmin" and "vmax" as "Normalize" and a colormap would
+
+        # Table of the colours of the map as bytes, viewed as one integer each
+        if (cmap,ncol) not in self.luts:
+            lut = plt.get_cmap(cmap,ncol)(np.arange(ncol),bytes=True)
+            self.luts[(cmap,ncol)] = np.ascontiguousarray(lut).view(
+                np.uint32).reshape(-1)
+        lut = self.luts[(cmap,ncol)]
+
+        # Interpolate to every pixel and find the colour bin of each, the nodes
+        # are always valid so gathering with "clip" skips the bounds checks
+        p = np.ravel(p).astype(np.float32); v = self.v; t = self.t;
+        np.take(p,self.nodes[0],out=v,mode='clip'); v *= self.w[0];
+        for n in range(1,4):
+            np.take(p,self.nodes[n],out=t,mode='clip'); t *= self.w[n]; v += t;
+        v -= vmin; v *= ncol / (vmax - vmin);
+
+        # Pixels with values that are not finite, e.g. from a diverged run, are
+        # left transparent as "pcolormesh" masks them
+        bad = np.isfinite(v) == False; anybad = np.any(bad);
+        if anybad:
+            v[bad] = 0
+        k = np.clip(v,0,ncol-1).astype(np.intp)
+        col = np.take(lut,k,mode='clip')
+        if anybad:
+            col[bad] = 0
+        self.img_flat[self.pix] = col
+
+        return(self.img)
+
+################################################################################
+
+class RasterField(matplotlib.artist.Artist):
+    # Artist drawing a nodal field of a block with a "Rasteriser" straight into
+    # the pixels of the axes, which avoids the resampling of every image by
+    # "imshow". A rasteriser is only made when no artist has drawn the same 
+    # mesh into the same pixels recently, so several fields of one mesh share
+    # it. Set the limits of the axes before drawing
+
+    # Rasterisers shared by all of the artists, keyed on the mesh, the size of
+    # the image and its extent, only the most recently made are kept
+    rasters = {}; max_rasters = 4;
+
+    def __init__(self,ax,b,p,vmin,vmax,cmap='viridis'):
+
+        # Store the block and colour scale, drawn below lines like a mesh
+        super().__init__()
+        self.b = b; self.p = p; self.vmin = vmin; self.vmax = vmax;
+        self.cmap = cmap;
+        self.set_zorder(1)
+        ax.add_artist(self)
+
+        # Identify the mesh by its coordinates
+        self.mesh = hashlib.sha1(np.ascontiguousarray(b['x']).tobytes() + 
+            np.ascontiguousarray(b['y']).tobytes()).hexdigest()
+
+    def set_array(self,p):
+        # Change the values of the field for the next draw
+        self.p = p; self.stale = True;
+
+    def draw(self,renderer):
+        # Fill the whole pixels inside the axes with the coloured field
+
+        if self.get_visible() == False:
+            return
+
+        # Pixels covered by the axes and their extent in data coordinates
+        bbox = self.axes.bbox
+        x0 = int(round(bbox.x0)); y0 = int(round(bbox.y0));
+        w = int(round(bbox.x1)) - x0; h = int(round(bbox.y1)) - y0;
+        inv = self.axes.transData.inverted()
+        (x_min,y_min),(x_max,y_max) = inv.transform([[x0,y0],[x0+w,y0+h]])
+
+        # Rasterise the mesh only if it has not been done for these pixels,
+        # dropping the oldest rasteriser if there are too many
+        key = (self.mesh,w,h,x_min,x_max,y_min,y_max)
+        if key not in RasterField.rasters:
+            if len(RasterField.rasters) >= RasterField.max_rasters:
+                del RasterField.rasters[next(iter(RasterField.rasters))]
+            RasterField.rasters[key] = Rasteriser(self.b,
+                [x_min,x_max,y_min,y_max],w,h)
+        raster = RasterField.rasters[key]
+
+        # The renderer expects the first row of the image at the bottom
+        img = raster.render(self.p,self.vmin,self.vmax,self.cmap)
+        gc = renderer.new_gc()
+        gc.set_clip_rectangle(bbox)
+        renderer.draw_image(gc,x0,y0,np.ascontiguousarray(img[::-1]))
+        gc.restore()
+        self.stale = False
+
+################################################################################
+
+class MovieWriter:
+    # Write the frames of a figure to a movie by rendering each one with Agg 
+    # and piping the raw RGBA pixels straight to the stdin of an ffmpeg 
+    # process, so no frames are kept in memory whatever the length of the 
+    # movie. Use as a context manager and call "grab_frame" after every update
+
+    def __init__(self,fig,filename,fps=10,dpi=None,extra_args=[]):
+
+        # Render the figure at the requested resolution with an Agg canvas
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        if dpi is not None:
+            fig.set_dpi(dpi)
+        self.canvas = FigureCanvasAgg(fig)
+        self.canvas.draw()
+        w,h = self.canvas.get_width_height()
+
+        # Start ffmpeg reading raw frames of that size from its stdin
+        cmd = ['ffmpeg','-y','-loglevel','error','-f','rawvideo','-vcodec',
+            'rawvideo','-pix_fmt','rgba','-s',f'{w}x{h}','-r',str(fps),
+            '-i','-'] + extra_args + [filename]
+        self.proc = subprocess.Popen(cmd,stdin=subprocess.PIPE)
+
+    def grab_frame(self):
+        # Render the current state of the figure and send it to ffmpeg
+        self.canvas.draw()
+        self.proc.stdin.write(self.canvas.buffer_rgba())
+
+    def finish(self):
+        # Close the pipe and wait for the movie to be encoded
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError('ffmpeg failed with code ' + 
+                str(self.proc.returncode))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.finish()
+
+################################################################################
+
+def assemble_movie(segments,filename,fps=10):
+    # Join movie segments of the same format, each holding consecutive frames,
+    # into a single movie in the order they are given. Segments are joined by
+    # the concat demuxer of ffmpeg without encoding them again if it is
+    # installed, otherwise they must be GIFs and their frames are joined
+    # into a new GIF as "PillowWriter" does
+
+    if shutil.which('ffmpeg') is not None:
+
+        # List the segments in a file next to the first one and copy them
+        listname = os.path.join(os.path.dirname(segments[0]),'segments.txt')
+        with open(listname,'w') as f:
+            for segment in segments:
+                f.write(f"file '{os.path.abspath(segment)}'\n")
+        cmd = ['ffmpeg','-y','-loglevel','error','-f','concat','-safe','0',
+            '-i',listname,'-c','copy',filename]
+        proc = subprocess.run(cmd)
+        if proc.returncode != 0:
+            raise RuntimeError('ffmpeg failed with code ' + 
+                str(proc.returncode))
+
+    else:
+
+        # Read every frame of the segments in turn
+        from PIL import Image, ImageSequence
+        frames = []
+        for segment in segments:
+            with Image.open(segment) as im:
+                for frame in ImageSequence.Iterator(im):
+                    frames.append(frame.convert('RGB'))
+        frames[0].save(filename,save_all=True,append_images=frames[1:],
+            duration=int(1000/fps),loop=0)
+
+################################################################################
+
 def read_settings(filename):
     # Read settings and boundary conditions from an input file
 
@@ -600,63 +1102,142 @@ def read_settings(filename):
 
 ################################################################################
 
-def read_case(filename):
-    # Read coordinates and flowfield from an output file
+def case_fields(ni,nj,outtype):
+    # List the name, shape, data type and byte offset of every field in an 
+    # output file, in the order they are written by "write_output.f90"
+
+    # Mesh coordinates, cell areas, projected lengths and the wall array are 
+    # always written, note the wall array is a Fortran logical of 4 bytes
+    fields = [['x',[ni,nj],np.float32], ['y',[ni,nj],np.float32],
+        ['area',[ni-1,nj-1],np.float32], ['lx_i',[ni,nj-1],np.float32],
+        ['ly_i',[ni,nj-1],np.float32], ['lx_j',[ni-1,nj],np.float32],
+        ['ly_j',[ni-1,nj],np.float32], ['wall',[ni,nj],np.int32]]
+
+    # Flowfield data is written for an initial guess or any solution
+    if outtype > 1:
+        for name in ['ro','roe','rovx','rovy']:
+            fields.append([name,[ni,nj],np.float32])
+
+    # Cell increments are only written for a full solution
+    if outtype == 3:
+        for name in ['dro','droe','drovx','drovy']:
+            fields.append([name,[ni-1,nj-1],np.float32])
+
+    # Accumulate the offsets, the fields start after the two integer mesh size
+    offset = 8
+    for field in fields:
+        field.append(offset)
+        nbytes = field[1][0] * field[1][1] * np.dtype(field[2]).itemsize
+        offset = offset + nbytes
+
+    return(fields)
+
+################################################################################
+
+def read_header(filename):
+    # Read the layout of an output file. Files with a header written by
+    # "write_output.f90" describe themselves, older files without one are 
+    # identified by their name and the field table is built from the mesh size
+
+    # Initialise the dictionary to store the header data
+    h = {}
+
+    # Open the file to read and check for the magic string at the start
+    f = open(filename,'rb')
+    if f.read(8) == b'4A2_OUT_':
+
+        # Read the version, output type, step number, time and timestep
+        h['version'],h['outtype'],h['nstep'] = \
+            [x.item() for x in np.fromfile(f,dtype=np.int32,count=3)]
+        h['t_tot'],h['dt'] = \
+            [x.item() for x in np.fromfile(f,dtype=np.float32,count=2)]
+        nfield = np.fromfile(f,dtype=np.int32,count=1).item()
+
+        # Read the table of field names, shapes, data types and byte offsets
+        dt = np.dtype([('name','S8'),('ni',np.int32),('nj',np.int32),
+            ('dtype','S4'),('offset',np.int64)])
+        arr = np.fromfile(f,dtype=dt,count=nfield)
+        h['fields'] = [[a['name'].decode().strip(),[a['ni'].item(),
+            a['nj'].item()],np.dtype(a['dtype'].decode().strip()),
+            a['offset'].item()] for a in arr]
+
+        # Read the size of the mesh that follows the header
+        h['ni'],h['nj'] = [x.item() for x in np.fromfile(f,dtype=np.int32,
+            count=2)]
+
+    else:
+
+        # Determine the level of data included in the output file
+        if 'coord' in filename:
+            h['outtype'] = 1
+        elif 'guess' in filename:
+            h['outtype'] = 2
+        elif 'final' in filename:
+            h['outtype'] = 3
+        elif 'unste' in filename:
+            h['outtype'] = 4
+
+        # Read the size of the mesh at the start of the file
+        f.seek(0)
+        h['ni'],h['nj'] = [x.item() for x in np.fromfile(f,dtype=np.int32,
+            count=2)]
+        h['fields'] = case_fields(h['ni'],h['nj'],h['outtype'])
 
-    # Determine the level of data included in the output file
-    if 'coord' in filename:
-        outtype = 1
-    elif 'guess' in filename:
-        outtype = 2
-    elif 'final' in filename:
-        outtype = 3
-    elif 'unste' in filename:
-        outtype = 4
+    # Close the file
+    f.close()
+
+    return(h)
+
+################################################################################
+
+def read_case(filename,mmap=False,fields=None):
+    # Read coordinates and flowfield from an output file, if "mmap" is set the
+    # file is memory mapped and the arrays are read-only views into it that are
+    # only loaded from disk when they are used. A list of names in "fields" 
+    # restricts the arrays that are read, the rest of the file is skipped over
 
     # Initialise the dictionary to store the data
     g = {}
 
+    # Read the layout of the file, the size of the mesh and the step number and
+    # time if they have been recorded
+    h = read_header(filename)
+    for var in ['ni','nj','nstep','t_tot','dt']:
+        if var in h:
+            g[var] = h[var]
+    
+    # Get the names, sizes and positions of all the fields in the file and 
+    # keep only those that have been requested
+    table = h['fields']
+    if fields is not None:
+        table = [field for field in table if field[0] in fields]
+
     # Open the file to read
-    f = open(filename,'r')
+    f = open(filename,'rb')
 
-    # Read the size of the mesh
-    g['ni'] = np.fromfile(f,dtype=np.int32,count=1).item()
-    g['nj'] = np.fromfile(f,dtype=np.int32,count=1).item()
-    ni = g['ni']; nj = g['nj'];
-    
-    # Define the names and sizes of the mesh coordinate fields to read
-    fieldnames = ['x','y','area','lx_i','ly_i','lx_j','ly_j']
-    ni_mesh = np.array([0,0,-1,0,0,-1,-1]) + g['ni']
-    nj_mesh = np.array([0,0,-1,-1,-1,0,0]) + g['nj']
+    # Map the whole file as bytes, each field is then a slice of the map
+    if mmap == True:
+        m = np.memmap(filename,dtype=np.uint8,mode='r')
 
-    # Always read the mesh coordinates and projected lengths etc.
-    for n,name in enumerate(fieldnames):
+    # Read every requested field in the file
+    for name,shape,dtype,offset in table:
 
-        # Read the data elementwise and keep 1D temporarily
-        g[name] = np.fromfile(f,dtype=np.float32,count=ni_mesh[n]*nj_mesh[n]) 
+        # Either view the data in place or seek to the start of the field and
+        # read it elementwise into memory, keeping the array 1D temporarily
+        if mmap == True:
+            nbytes = shape[0] * shape[1] * np.dtype(dtype).itemsize
+            g[name] = m[offset:offset+nbytes].view(dtype)
+        else:
+            f.seek(offset)
+            g[name] = np.fromfile(f,dtype=dtype,count=shape[0]*shape[1])
 
         # Reshape the data into the correct numpy array shape, note Fortran
         # writes the data with the dimensions in the reverse order
-        g[name] = np.reshape(g[name],[ni_mesh[n],nj_mesh[n]],order='F')
+        g[name] = np.reshape(g[name],shape,order='F')
 
-    # Always read the logical array describing the wall position
-    g['wall'] = np.fromfile(f,dtype=np.int32,count=ni*nj) == 1
-    g['wall'] = np.reshape(g['wall'],[ni,nj],order='F')
-
-    # Read the flowfield data if written as an initial guess or full solution
-    if outtype > 1:
-        fieldnames = ['ro','roe','rovx','rovy']
-        for n,name in enumerate(fieldnames):
-            g[name] = np.fromfile(f,dtype=np.float32,count=ni*nj)
-            g[name] = np.reshape(g[name],[ni,nj],order='F')
-
-    # Read the cell increment only if the file is a full solution
-    if outtype == 3:
-        fieldnames = ['dro','droe','drovx','drovy']
-        ni = g['ni']-1; nj = g['nj']-1;
-        for n,name in enumerate(fieldnames):
-            g[name] = np.fromfile(f,dtype=np.float32,count=ni*nj)
-            g[name] = np.reshape(g[name],[ni,nj],order='F')
+    # Convert the logical array describing the wall position
+    if 'wall' in g:
+        g['wall'] = g['wall'] == 1
 
     # Close the file
     f.close()
@@ -665,20 +1246,607 @@ def read_case(filename):
    
 ################################################################################
 
-def read_conv(filename):
-    # Read residuals from a convergence log file
+def read_frame_mesh(folder):
+    # Read the mesh shared by all flow only unsteady frames in a folder, an 
+    # empty dictionary is returned if there is no shared mesh in the folder
+
+    # The shared mesh is written once by the solver with "outtype = 6"
+    filename = os.path.join(folder,'out_mesh.bin')
+    if os.path.exists(filename):
+        m = read_case(filename)
+    else:
+        m = {}
+
+    return(m)
+
+################################################################################
+
+def read_frame(filename,m=None,mmap=False,fields=None):
+    # Read an unsteady frame and attach the mesh to it, the mesh arrays are 
+    # shared between all frames and not copied. Pass in the mesh from
+    # "read_frame_mesh" as "m" to avoid reading it again for every frame
+
+    # Read the frame itself
+    g = read_case(filename,mmap,fields)
+
+    # Read the shared mesh from the same folder if it has not been passed in
+    if m is None:
+        m = read_frame_mesh(os.path.dirname(filename))
+
+    # A flow only frame is of no use without the mesh
+    if len(m) == 0 and read_header(filename)['outtype'] == 5:
+        raise ValueError('No shared mesh "out_mesh.bin" found for the flow '
+            + 'only frame ' + filename)
+
+    # Add the requested mesh variables that are missing from the frame
+    for var in m:
+        if var not in g and (fields is None or var in fields):
+            g[var] = m[var]
+
+    return(g)
+
+################################################################################
+
+def read_frames(pattern,fields=['ro','roe','rovx','rovy'],stride=1,
+    workers=1):
+    # Read every "stride" unsteady frame matching a file pattern into a single
+    # contiguous float32 array per field with a leading frame axis. The arrays
+    # are filled in place directly from the files and the mesh is read once and
+    # shared, all frames are assumed to have the same layout as the first one.
+    # The frames are read by a pool of threads if "workers" is more than one
+
+    # Find the files in order and get their layout from the first, the mesh is
+    # read separately so it is never stacked
+    meshnames = ['x','y','area','lx_i','ly_i','lx_j','ly_j','wall']
+    files = sorted(glob.glob(pattern))[::stride]; nframes = len(files);
+    h = read_header(files[0])
+    table = [field for field in h['fields'] if field[0] in fields and 
+        field[0] not in meshnames]
 
     # Initialise the dictionary to store the data
-    l = {}
+    g = {'ni': h['ni'], 'nj': h['nj']}
+
+    # Allocate the arrays, note Fortran writes each field with the dimensions
+    # in the reverse order so the last two axes are swapped when finished
+    arr = {}
+    for name,shape,dtype,offset in table:
+        arr[name] = np.empty([nframes,shape[1],shape[0]],dtype=np.float32)
+
+    # Also store the step number and time of the frames if they are recorded
+    if 'nstep' in h:
+        g['nstep'] = np.zeros(nframes,dtype=np.int32)
+        g['t_tot'] = np.zeros(nframes,dtype=np.float32)
+
+    # Read the fields of a frame straight into their place in the arrays, a 
+    # truncated frame would otherwise leave part of its slot uninitialised
+    def read_into(k):
+        with open(files[k],'rb') as f:
+            for name,shape,dtype,offset in table:
+                f.seek(offset)
+                if f.readinto(arr[name][k]) != arr[name][k].nbytes:
+                    raise ValueError(f'Frame {files[k]} is truncated in '
+                        + f'field {name}')
+            if 'nstep' in h:
+                f.seek(16); 
+                g['nstep'][k] = np.fromfile(f,dtype=np.int32,count=1)[0]
+                g['t_tot'][k] = np.fromfile(f,dtype=np.float32,count=1)[0]
+
+    # Read every frame, each one fills its own slot so the order is kept
+    map_frames(read_into,range(nframes),workers)
+
+    # Store the arrays with the correct dimension order in the dictionary
+    for name in arr:
+        g[name] = np.swapaxes(arr[name],1,2)
+
+    # Attach a single copy of the mesh, from the shared file if there is one
+    # or otherwise from the first frame
+    m = read_frame_mesh(os.path.dirname(files[0]))
+    if len(m) == 0:
+        m = read_case(files[0],fields=meshnames)
+    for var in meshnames:
+        g[var] = m[var]
 
-    # Read the entire file into a single array
-    arr = np.loadtxt(filename)
+    return(g)
 
-    # Store the columns in the log dictionary
+################################################################################
+
+def map_frames(func,frames,workers=1):
+    # Apply a function to every item in a list of frames and return the results
+    # in the same order, using a pool of threads if "workers" is more than one.
+    # Reading and numpy operations release the lock on the interpreter so the
+    # threads run concurrently
+
+    # Use all of the cores if the number of workers is not set
+    if workers is None:
+        workers = os.cpu_count()
+
+    # Evaluate in turn or in the pool of threads
+    if workers == 1:
+        results = [func(frame) for frame in frames]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+            results = list(pool.map(func,frames))
+
+    return(results)
+
+################################################################################
+
+def prefetch_frames(func,frames,workers=1):
+    # Apply a function to every item in a list of frames in a pool of threads 
+    # ahead of when the results are needed and yield them in order, so frames
+    # are read and processed while the previous ones are being used. The 
+    # function is also given a workspace dictionary for "calc_secondary_ws", 
+    # there is one for every frame in flight and each is reused for a new frame
+    # once the result after the one using it has been asked for
+
+    # Use all of the cores if the number of workers is not set
+    if workers is None:
+        workers = os.cpu_count()
+
+    # One workspace for each frame being processed and one for the frame in use
+    ws = [{} for n in range(workers+1)]
+    def process(k):
+        return func(frames[k],ws[k % (workers+1)])
+
+    # Keep every worker busy with the frames following the one in use
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        futures = [pool.submit(process,k) for k in range(min(workers,
+            len(frames)))]
+        for k in range(len(frames)):
+            result = futures[k].result(); futures[k] = None;
+            if k + workers < len(frames):
+                futures.append(pool.submit(process,k + workers))
+            yield result
+
+################################################################################
+
+def calc_integrals(av,g):
+    # Calculate the integral quantities printed for the final solution by 
+    # "plot_contours" from the inlet and outlet planes of a block, a block of
+    # stacked frames gives arrays with the value in each frame. Secondary 
+    # variables are only calculated on the two cuts
+
+    # Take the cuts without calculating anything on the rest of the block
+    if not isinstance(g,FlowField):
+        g = FlowField(av,g)
+    c_in = cut_i(g,0); c_out = cut_i(g,-1);
+
+    # Mass flow rates and mass averaged stagnation quantities
+    s = {}
+    s['tstag_in'],mass_in = mass_av(c_in,'tstag')
+    s['tstag_out'],mass_out = mass_av(c_out,'tstag')
+    s['mdot_in'] = np.sum(mass_in,-1); s['mdot_out'] = np.sum(mass_out,-1);
+    s['pstag_in'],_ = mass_av(c_in,'pstag')
+    s['pstag_out'],_ = mass_av(c_out,'pstag')
+
+    # Area averaged static pressures
+    s['p_in'],_ = area_av(c_in,'p')
+    s['p_out'],_ = area_av(c_out,'p')
+
+    # Ratios of the outlet to the inlet values
+    s['tstag_ratio'] = s['tstag_out'] / s['tstag_in']
+    s['mdot_ratio'] = s['mdot_out'] / s['mdot_in']
+
+    return(s)
+
+################################################################################
+
+def integral_series(files,av,m=None,workers=1):
+    # Calculate the integral quantities of "calc_integrals" for every frame in
+    # a list of files as a time series. Only one frame per worker is held in
+    # memory at once and each is memory mapped, so only the series grows with
+    # the number of frames
+
+    # Read the shared mesh once before starting
+    if m is None:
+        m = read_frame_mesh(os.path.dirname(files[0]))
+
+    # Calculate the quantities of a single frame, keeping its step and time
+    def process(filename):
+        g = read_frame(filename,m,mmap=True)
+        s = calc_integrals(av,g)
+        for var in ['nstep','t_tot']:
+            if var in g:
+                s[var] = g[var]
+        return(s)
+
+    # Collect the scalars of every frame into arrays in order
+    results = map_frames(process,files,workers)
+    s = {}
+    for var in results[0]:
+        s[var] = np.array([r[var] for r in results])
+
+    return(s)
+
+################################################################################
+
+def write_series(filename,s):
+    # Write a time series of scalars to a compressed numpy archive if the name
+    # ends in ".npz", otherwise to a comma separated text file with a header
+    if filename.endswith('.npz'):
+        np.savez_compressed(filename,**s)
+    else:
+        names = list(s)
+        np.savetxt(filename,np.column_stack([s[var] for var in names]),
+            delimiter=',',header=','.join(names),comments='',fmt='%.8g')
+
+################################################################################
+
+class FrameStore:
+    # Random access to unsteady frames appended to a single container file by
+    # the solver with "outtype = 7". The file is memory mapped, "data" is a 
+    # read-only (nframes,nfield,ni,nj) array and "nstep" and "t_tot" index the
+    # frames, so frame k is simply a slice and nothing is read until it is used
+
+    def __init__(self,filename,m=None):
+
+        # Open the file to read and check the magic string
+        f = open(filename,'rb')
+        if f.read(8) != b'4A2_FRM_':
+            raise ValueError('Not a container of unsteady frames: ' + filename)
+
+        # Read the version, mesh size and the names of the fields in each frame
+        self.version,self.ni,self.nj,nfield = \
+            [x.item() for x in np.fromfile(f,dtype=np.int32,count=4)]
+        self.fieldnames = [x.decode().strip() for x in 
+            np.fromfile(f,dtype='S8',count=nfield)]
+
+        # Read the length of every frame, the frames start after the header
+        stride = np.fromfile(f,dtype=np.int64,count=1).item()
+        offset = f.tell()
+        f.close()
+
+        # Only count complete frames, the last may still be being written
+        nframes = (os.path.getsize(filename) - offset) // stride
+
+        # Each frame is the step number and time followed by the fields, note
+        # Fortran writes the data with the dimensions in the reverse order
+        dt = np.dtype([('nstep',np.int32),('t_tot',np.float32),
+            ('data',np.float32,(nfield,self.nj,self.ni))])
+        if nframes > 0:
+            self.frames = np.memmap(filename,dtype=dt,mode='r',offset=offset,
+                shape=(nframes,))
+        else:
+            self.frames = np.zeros(0,dtype=dt)
+
+        # Views of the frame index and the data in the correct numpy order
+        self.nstep = self.frames['nstep']; self.t_tot = self.frames['t_tot'];
+        self.data = np.swapaxes(self.frames['data'],2,3)
+
+        # Read the mesh shared by all of the frames
+        if m is None:
+            m = read_frame_mesh(os.path.dirname(filename))
+        self.m = m
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def field(self,name):
+        # All frames of a single field as a (nframes,ni,nj) array
+        return self.data[:,self.fieldnames.index(name)]
+
+    def __getitem__(self,k):
+        # A single frame in the same dictionary form as "read_frame"
+        g = {'ni': self.ni, 'nj': self.nj, 'nstep': self.nstep[k].item(),
+            't_tot': self.t_tot[k].item()}
+        for n,name in enumerate(self.fieldnames):
+            g[name] = self.data[k,n]
+        for var in self.m:
+            if var not in g:
+                g[var] = self.m[var]
+        return g
+
+################################################################################
+
+class Probes:
+    # Values at fixed points in a block, e.g. probe locations or points along a
+    # line from "sample_line", interpolated bilinearly from the nodes of the 
+    # cell containing each point. The cells and weights are found once from the
+    # mesh in "b", so each frame after only needs the four nodes around every
+    # point, which are gathered straight from memory mapped files
+
+    def __init__(self,b,x,y):
+
+        # Store the points as flat arrays and remember their original shape
+        self.shape = np.shape(x)
+        x = np.ravel(x).astype(float); y = np.ravel(y).astype(float);
+        xm = np.asarray(b['x'],dtype=float)
+        ym = np.asarray(b['y'],dtype=float)
+        self.ni,self.nj = np.shape(xm)
+
+        # Local coordinates of points in quadrilateral cells with corners in 
+        # the order (i,j), (i+1,j), (i+1,j+1), (i,j+1), found by inverting the
+        # bilinear mapping with a Newton iteration from the middle of the cell
+        def local_coords(i,j,x,y):
+            xc = np.stack([xm[i,j],xm[i+1,j],xm[i+1,j+1],xm[i,j+1]],-1)
+            yc = np.stack([ym[i,j],ym[i+1,j],ym[i+1,j+1],ym[i,j+1]],-1)
+            s = np.full(np.shape(i),0.5); t = np.full(np.shape(i),0.5);
+            for n in range(20):
+                w = np.stack([(1-s)*(1-t),s*(1-t),s*t,(1-s)*t],-1)
+                ws = np.stack([t-1,1-t,t,-t],-1)
+                wt = np.stack([s-1,-s,s,1-s],-1)
+                rx = np.sum(w*xc,-1) - x; ry = np.sum(w*yc,-1) - y;
+                xs = np.sum(ws*xc,-1); xt = np.sum(wt*xc,-1);
+                ys = np.sum(ws*yc,-1); yt = np.sum(wt*yc,-1);
+                det = xs*yt - xt*ys
+                with np.errstate(divide='ignore',invalid='ignore'):
+                    s = s - (yt*rx - xt*ry) / det
+                    t = t - (xs*ry - ys*rx) / det
+            return(s,t)
+
+        # Check the cells around the nearest node to each point first, and all
+        # of the cells only for points that are not in any of those
+        self.i = np.zeros([len(x),4],dtype=int)
+        self.j = np.zeros([len(x),4],dtype=int)
+        self.w = np.zeros([len(x),4])
+        i_all,j_all = np.meshgrid(np.arange(self.ni-1),np.arange(self.nj-1),
+            indexing='ij')
+        i_all = i_all.ravel(); j_all = j_all.ravel();
+        for n in range(len(x)):
+            i_node,j_node = np.unravel_index(np.argmin((xm - x[n])**2 + 
+                (ym - y[n])**2),[self.ni,self.nj])
+            i_near = np.clip(i_node + np.array([-1,0,-1,0]),0,self.ni-2)
+            j_near = np.clip(j_node + np.array([-1,-1,0,0]),0,self.nj-2)
+            for i_cell,j_cell in [[i_near,j_near],[i_all,j_all]]:
+                s,t = local_coords(i_cell,j_cell,x[n],y[n])
+                q = np.flatnonzero((s > -1e-6) & (s < 1+1e-6) & 
+                    (t > -1e-6) & (t < 1+1e-6))
+                if len(q) > 0:
+                    break
+            if len(q) == 0:
+                raise ValueError(f'Point ({x[n]},{y[n]}) is outside the mesh')
+
+            # Store the nodes of the cell and their weights
+            i = i_cell[q[0]]; j = j_cell[q[0]]; s = s[q[0]]; t = t[q[0]];
+            self.i[n] = [i,i+1,i+1,i]; self.j[n] = [j,j,j+1,j+1];
+            self.w[n] = [(1-s)*(1-t),s*(1-t),s*t,(1-s)*t]
+
+    def interp(self,p):
+        # Interpolate a nodal array to the points, any leading axes such as a
+        # frame axis are kept in front of the shape of the points
+        v = np.sum(p[...,self.i,self.j] * self.w,-1)
+        return np.reshape(v,np.shape(p)[:-2] + self.shape)
+
+    def read(self,filename,fields=['ro','roe','rovx','rovy']):
+        # Read the values of fields at the points from a single output file,
+        # only the pages of the file holding the nodes used are read from disk
+        g = read_case(filename,mmap=True,fields=fields)
+        for name in list(g):
+            if np.shape(g[name]) == (self.ni,self.nj):
+                g[name] = self.interp(g[name])
+            elif name not in ['ni','nj','nstep','t_tot','dt']:
+                del g[name]
+        return(g)
+
+    def read_frames(self,files,fields=['ro','roe','rovx','rovy'],workers=1):
+        # Read the time histories of fields at the points from a list of files
+        # into arrays with a leading frame axis, in parallel if "workers" is 
+        # more than one
+        g = self.read(files[0],fields)
+        h = {}
+        for name in g:
+            h[name] = np.zeros((len(files),) + np.shape(g[name]),
+                dtype=np.asarray(g[name]).dtype)
+
+        # Read each frame into its own slot so the order is kept
+        def read_into(k):
+            g = self.read(files[k],fields)
+            for name in h:
+                h[name][k] = g[name]
+        map_frames(read_into,range(len(files)),workers)
+
+        return(h)
+
+################################################################################
+
+def sample_line(x,y,n):
+    # Sample a polyline through the points "x" and "y" at "n" points equally
+    # spaced along its length, returning their coordinates and distances
+    s_line = dist(x,y)
+    s = np.linspace(0,s_line[-1],n)
+    return(np.interp(s,s_line,x),np.interp(s,s_line,y),s)
+
+################################################################################
+
+def frame_complete(filename):
+    # Check whether an output file has been completely written by comparing its
+    # size to the end of the last field in its table
+
+    # The header cannot be read if the file is too short
+    try:
+        h = read_header(filename)
+        name,shape,dtype,offset = h['fields'][-1]
+        nbytes = offset + shape[0] * shape[1] * np.dtype(dtype).itemsize
+    except (ValueError,IndexError,UnicodeDecodeError):
+        return(False)
+
+    return(os.path.getsize(filename) >= nbytes)
+
+################################################################################
+
+def follow_frames(folder,pattern='out_unste_*.bin',poll=1.0,timeout=None):
+    # Yield the names of the unsteady frames in a folder in order as the solver
+    # writes them, so that they can be plotted while the run continues. The
+    # folder is polled every "poll" seconds and a frame is only yielded once its
+    # size has stopped changing and it is complete. The generator finishes when
+    # no new frames have appeared for "timeout" seconds, or never if it is None
+
+    # Initialise the frames already yielded and the last size of the others
+    done = set(); sizes = {}; t_new = time.time();
+
+    while True:
+
+        # Yield the finished frames in order, holding back all those after the
+        # first one that is still being written but recording their sizes
+        waiting = False
+        for filename in sorted(glob.glob(os.path.join(folder,pattern))):
+            if filename in done:
+                continue
+            size = os.path.getsize(filename)
+            stable = sizes.get(filename) == size; sizes[filename] = size;
+            if waiting == False and stable and frame_complete(filename):
+                done.add(filename); t_new = time.time();
+                yield filename
+            else:
+                waiting = True
+
+        # Finish if the solver has stopped writing frames
+        if timeout is not None and time.time() - t_new > timeout:
+            return
+
+        # Wait before checking the folder again
+        time.sleep(poll)
+
+################################################################################
+
+# Version of the entries written by "read_cached", increase it whenever the
+# variables calculated by "calc_secondary" change so old entries are not used
+cache_version = 1
+
+def read_cached(filename,av,m=None,cache_dir='.cache_4a2',max_bytes=2e9):
+    # Read an output file and calculate its secondary variables, keeping the
+    # results as .npy files in a cache directory so that later calls for the
+    # same file skip the decoding and calculation entirely. Entries are keyed on
+    # the path, size and modification time of the file, the gas constants and
+    # "cache_version", the least recently used are deleted when the cache 
+    # exceeds "max_bytes"
+
+    # Read the shared mesh if the file is a flow only unsteady frame
+    if m is None:
+        m = read_frame_mesh(os.path.dirname(filename))
+
+    # Generate the key for this file and these gas constants
+    st = os.stat(filename)
+    key = repr([os.path.abspath(filename),st.st_size,st.st_mtime_ns,
+        av['gam'],av['rgas'],av['cp'],cache_version])
+    entry = os.path.join(cache_dir,hashlib.sha1(key.encode()).hexdigest())
+
+    # Load the arrays as copy-on-write memory maps if they are already cached,
+    # so they can be changed in place like freshly calculated arrays without 
+    # changing the cache, and mark the entry as recently used
+    if os.path.isdir(entry):
+        with open(os.path.join(entry,'meta.json'),'r') as f:
+            g = json.load(f)
+        for name in g.pop('arrays'):
+            g[name] = np.load(os.path.join(entry,name + '.npy'),mmap_mode='c')
+        os.utime(entry)
+
+    # Otherwise read and process the file and write a new entry, this is done
+    # in a temporary directory first so incomplete entries are never read
+    else:
+        g = calc_secondary(av,read_frame(filename,m))
+        os.makedirs(cache_dir,exist_ok=True)
+        temp = tempfile.mkdtemp(dir=cache_dir)
+        meta = {'arrays': []}
+        for var in g:
+            if isinstance(g[var],np.ndarray):
+                if var not in m:
+                    np.save(os.path.join(temp,var + '.npy'),g[var])
+                    meta['arrays'].append(var)
+            else:
+                meta[var] = g[var]
+        with open(os.path.join(temp,'meta.json'),'w') as f:
+            json.dump(meta,f)
+        try:
+            os.rename(temp,entry)
+        except OSError:
+            shutil.rmtree(temp,ignore_errors=True)
+        evict_cache(cache_dir,max_bytes)
+
+    # Attach the shared mesh
+    for var in m:
+        if var not in g:
+            g[var] = m[var]
+
+    return(g)
+
+################################################################################
+
+def evict_cache(cache_dir,max_bytes):
+    # Delete the least recently used entries from the cache until its total 
+    # size is below "max_bytes"
+
+    # Find the size and last use of every entry
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir,name)
+        try:
+            nbytes = sum([os.path.getsize(os.path.join(entry,x)) for x in 
+                os.listdir(entry)])
+            entries.append([os.path.getmtime(entry),nbytes,entry])
+        except OSError:
+            continue
+
+    # Remove the oldest entries first
+    entries.sort(); total = sum([e[1] for e in entries]);
+    for t,nbytes,entry in entries:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry,ignore_errors=True)
+        total = total - nbytes
+
+    return
+
+################################################################################
+
+def read_conv(filename,l=None):
+    # Read residuals from a text or binary convergence log file. Pass in the 
+    # dictionary from a previous call as "l" to only read the rows of a text log
+    # that have been appended since, the columns are then extended in place so
+    # a refresh during a long run costs the same however many rows have already
+    # been read
+
+    # Names of the columns in the log
     fieldnames = ['nstep', 'dro_avg', 'droe_avg', 'drovx_avg', 'drovy_avg', 
         'dro_max', 'droe_max', 'drovx_max', 'drovy_max']
+
+    # A binary log written by the solver with "convtype = 2" is memory mapped 
+    # directly, every call maps all of the complete records again
+    f = open(filename,'rb')
+    if f.read(8) == b'4A2_CNV_':
+        nres = np.fromfile(f,dtype=np.int32,count=1).item(); f.close();
+        dt = np.dtype([('nstep',np.int32),('res',np.float32,(nres,))])
+        nrow = (os.path.getsize(filename) - 12) // dt.itemsize
+        if nrow > 0:
+            arr = np.memmap(filename,dtype=dt,mode='r',offset=12,shape=(nrow,))
+        else:
+            arr = np.zeros(0,dtype=dt)
+        if l is None:
+            l = {}
+        l['nrow'] = nrow; l['nstep'] = arr['nstep'];
+        for n,name in enumerate(fieldnames[1:]):
+            l[name] = arr['res'][:,n]
+        return(l)
+    f.close()
+
+    # Initialise the dictionary to store the data, the columns are views of a
+    # buffer that has spare rows to append to
+    if l is None:
+        l = {'offset': 0, 'nrow': 0, 'buffer': np.zeros([0,9])}
+
+    # Read everything after the last complete row that has been parsed already
+    f = open(filename,'rb')
+    f.seek(l['offset']); chunk = f.read();
+    f.close()
+
+    # Only parse complete lines, a partly written last line is left for later
+    end = chunk.rfind(b'\n') + 1
+    arr = np.array(chunk[:end].split(),dtype=float).reshape([-1,9])
+    l['offset'] = l['offset'] + end
+
+    # Double the size of the buffer if it is too small for the new rows
+    nrow = l['nrow'] + np.shape(arr)[0]
+    if nrow > np.shape(l['buffer'])[0]:
+        buf = np.zeros([max(nrow,2 * np.shape(l['buffer'])[0]),9])
+        buf[:l['nrow'],:] = l['buffer'][:l['nrow'],:]
+        l['buffer'] = buf
+
+    # Append the new rows
+    l['buffer'][l['nrow']:nrow,:] = arr; l['nrow'] = nrow;
+
+    # Store the columns in the log dictionary
     for n,name in enumerate(fieldnames):
-        l[name] = arr[:,n]
+        l[name] = l['buffer'][:nrow,n]
 
     return(l)
 
@@ -24,6 +24,17 @@
       real :: d_max = 1, d_avg = 1
       integer :: nstep, nconv = 5, ncheck = 5, nframes = 100   
 
+!     Choose the format of the unsteady frames, "unstetype = 4" writes the mesh
+!     into every frame, "unstetype = 5" writes only the flow into every frame
+!     and the mesh once into a shared file, "unstetype = 7" also writes the mesh
+!     once but appends the flow of every frame to a single container file
+      integer :: unstetype = 5
+
+!     Choose the format of the convergence history, "convtype = 1" writes a
+!     text file and "convtype = 2" writes a smaller binary file that is faster
+!     to write and to read for very long runs
+      integer :: convtype = 1
+
 !     Read in the data on the run settings
       call read_settings(av,bcs)
       
@@ -80,8 +91,16 @@
       call set_bcs(av,bcs)
 
 !     Open file to store the convergence history. This is human readable during
-!     a long run by using "tail -f conv_example.csv" in a terminal window
-      open(unit=3,file='conv_' // av%casename // '.csv')
+!     a long run by using "tail -f conv_example.csv" in a terminal window. The
+!     binary file starts with a magic string and the number of residuals in
+!     every record, each record is then the step number and the residuals
+      if(convtype == 1) then
+          open(unit=3,file='conv_' // av%casename // '.csv')
+      else
+          open(unit=3,file='conv_' // av%casename // '.bin', &
+              form='unformatted',access='stream',status='replace')
+          write(3) '4A2_CNV_', 8
+      end if
 
 !     Initialise the "stopit" file, during long runs you can request an output
 !     is written by setting the value to 1, or to terminate the calculation if
@@ -89,6 +108,9 @@
       open(unit=11,file='stopit')
       write(11,*) 0; close(11);
 
+!     Write the mesh shared by all of the unsteady frames if required
+      if(unstetype >= 5) call write_output(av,g,6)
+
 !     Start the time stepping do loop for "nsteps". This is now the heart of the
 !     program, you should aim to program anything inside this loop to operate as
 !     efficiently as you can.
@@ -118,7 +140,7 @@
           
           ! Print a set number of frames for the unsteady output
           if(mod(av%nstep,av%nsteps/nframes) == 0) then
-              call write_output(av,g,4)
+              call write_output(av,g,unstetype)
               av%frame_no = av%frame_no + 1
           end if
 
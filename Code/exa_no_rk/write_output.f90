@@ -9,19 +9,55 @@
       integer, intent(in) :: outtype
       character(len=5) :: outname
       character(len=8) :: string
+      character(len=8) :: names(16)
+      character(len=4) :: dtypes(16)
+      integer :: shapes(2,16), nfield, n
+      integer(kind=8) :: offset
+      logical :: write_mesh, write_flow
 
 !     Check what data to write to file depending on the value contained within
 !     "outtype", options are to output grid coordinates only, grid + initial
-!     guess, or the complete works 
+!     guess, or the complete works. For unsteady runs there are three options, 
+!     either grid + flow in every frame with "outtype = 4", or flow only frames
+!     with "outtype = 5" that share a single grid file written once with 
+!     "outtype = 6", or flow only frames appended to a single container file 
+!     with "outtype = 7" that also share the grid file
+
+!     Append a frame to the container file, the header is written with the
+!     first frame and every frame is then a fixed length record of the step
+!     number, the time and the primary flow variables
+      if(outtype == 7) then
+          if(av%frame_no == 0) then
+              open(unit=7,file='tunnel_blowdown/out_frames.bin', &
+                  form='unformatted',access='stream',status='replace')
+              write(7) '4A2_FRM_', 1, g%ni, g%nj, 4
+              write(7) [character(len=8) :: 'ro', 'roe', 'rovx', 'rovy']
+              write(7) int(8 + 16 * g%ni * g%nj,kind=8)
+          else
+              open(unit=7,file='tunnel_blowdown/out_frames.bin', &
+                  form='unformatted',access='stream',status='old', &
+                  position='append')
+          end if
+          write(7) av%nstep, av%t_tot
+          write(7) g%ro; write(7) g%roe; write(7) g%rovx; write(7) g%rovy;
+          close(7)
+          return
+      end if
+
       if(outtype == 1) then
           outname = 'coord'
       elseif(outtype == 2) then
           outname = 'guess'
       elseif(outtype == 3) then
           outname = 'final'
-      elseif(outtype == 4) then
+      elseif(outtype == 4 .or. outtype == 5) then
           outname = 'unste'
       end if
+
+!     The mesh is written in all files apart from the flow only unsteady frames,
+!     the flow is written in all files apart from the grid only ones
+      write_mesh = outtype /= 5
+      write_flow = outtype > 1 .and. outtype /= 6
       
 !     Open a new file to write the data into, it is an unformatted binary file
 !     that takes up minimal space but contains all of the grid, flow and
@@ -29,31 +65,87 @@
 !     straightforward to read into other programs as long as you know the
 !     structure.
 
-      if(outtype /= 4) then
+      if(outtype <= 3) then
           open(unit=7,file='out_' // outname // '_' // av%casename // '.bin', &
               form='unformatted',access='stream',status='replace')
-      elseif(outtype == 4) then
+      elseif(outtype == 6) then
+          open(unit=7,file='tunnel_blowdown/out_mesh.bin', &
+              form='unformatted',access='stream',status='replace')
+      else
           write(string, '(I5.5)') av%frame_no
           open(unit=7,file='tunnel_blowdown/out_' // outname // '_' // trim(string) // '.bin', &
               form='unformatted',access='stream',status='replace')
       end if
 
+!     Build a table of the fields in the order they are written below, starting
+!     with the mesh coordinates, areas, projected lengths and walls
+      nfield = 0
+      if(write_mesh) then
+          names(1:8) = [character(len=8) :: 'x', 'y', 'area', 'lx_i', &
+              'ly_i', 'lx_j', 'ly_j', 'wall']
+          dtypes(1:8) = [character(len=4) :: 'f4', 'f4', 'f4', 'f4', 'f4', &
+              'f4', 'f4', 'i4']
+          shapes(:,1:8) = reshape([g%ni, g%nj, g%ni, g%nj, g%ni-1, g%nj-1, &
+              g%ni, g%nj-1, g%ni, g%nj-1, g%ni-1, g%nj, g%ni-1, g%nj, g%ni, &
+              g%nj],[2,8])
+          nfield = 8
+      end if
+
+!     Primary flow variables are included for a guess or any solution
+      if(write_flow) then
+          names(nfield+1:nfield+4) = [character(len=8) :: 'ro', 'roe', &
+              'rovx', 'rovy']
+          dtypes(nfield+1:nfield+4) = 'f4'
+          shapes(1,nfield+1:nfield+4) = g%ni
+          shapes(2,nfield+1:nfield+4) = g%nj
+          nfield = nfield + 4
+      end if
+
+!     Cell increments are included only for a complete solution
+      if(outtype == 3) then
+          names(nfield+1:nfield+4) = [character(len=8) :: 'dro', 'droe', &
+              'drovx', 'drovy']
+          dtypes(nfield+1:nfield+4) = 'f4'
+          shapes(1,nfield+1:nfield+4) = g%ni-1
+          shapes(2,nfield+1:nfield+4) = g%nj-1
+          nfield = nfield + 4
+      end if
+
+!     Write a self describing header so the file can be read without knowing
+!     its name, it contains a magic string, format version, output type, the
+!     step number, solution time and timestep
+      write(7) '4A2_OUT_', 1, outtype, av%nstep, av%t_tot, av%dt, nfield
+
+!     Write the field table, each entry is 28 bytes long and the offsets are
+!     in bytes from the start of the file. All data is 4 bytes per element and
+!     the first field comes after the header and the mesh size
+      offset = 32 + 28 * nfield + 8
+      do n = 1,nfield
+          write(7) names(n), shapes(:,n), dtypes(n), offset
+          offset = offset + 4 * shapes(1,n) * shapes(2,n)
+      end do
+
 !     Write the size of the mesh
       write(7) [g%ni, g%nj]
 
-!     Always write mesh coordinates
-      write(7) g%x; write(7) g%y; 
+!     Write the mesh unless it is shared with other unsteady frames
+      if(write_mesh) then
+
+!         Write mesh coordinates
+          write(7) g%x; write(7) g%y; 
 
-!     Always write cell areas and projected facet lengths 
-      write(7) g%area; write(7) g%lx_i; write(7) g%ly_i; 
-      write(7) g%lx_j; write(7) g%ly_j;
+!         Write cell areas and projected facet lengths 
+          write(7) g%area; write(7) g%lx_i; write(7) g%ly_i; 
+          write(7) g%lx_j; write(7) g%ly_j;
 
-!     Always write the wall array
-      write(7) g%wall
+!         Write the wall array
+          write(7) g%wall
+
+      end if
 
 !     Write flow solution if it has been initialised with an initial guess or 
 !     has been completely solved
-      if(outtype > 1) then
+      if(write_flow) then
 
 !         Write primary flow variables only
           write(7) g%ro; write(7) g%roe;           
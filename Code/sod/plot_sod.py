@@ -33,8 +33,18 @@ def main():
     g = calc_secondary(av,g)    
 
 
+    # Time of the solution, the solver always runs the sod case to 0.2s
+    t = 0.2
+
+    # Calculate the exact solution on a fine grid for plotting, the velocity is
+    # normalised by the exact velocity in the star region
+    x_exact = np.linspace(0,1,1001)
+    s = calc_sod_exact(x_exact, t, av['gam'])
+    ro_exact, p_exact, vx_exact = s['ro'], s['p'], s['vx']
+    v_star = s['vx_star']
+
     g['ro_ratio'] = g['ro']/1.0
-    g['v_ratio'] = g['v']/0.89095233
+    g['v_ratio'] = g['v']/v_star
 
     # Specify the parameters to plot
     fieldnames = ['ro_ratio','v_ratio','p']; 
@@ -44,10 +54,8 @@ def main():
     # j_pos = 0
     j_pos = j_mid
 
-    #Calculate and output the error metrics to the exact solution
-    file_path = 'sod.raw'
-
-    errors = calc_sod_error(g, file_path, j_pos)
+    #Calculate and output the error metrics to the exact solution at that time
+    errors = calc_sod_error(g, t, j_pos, av['gam'])
     print()
     print(f'Density Error (ro): {errors["ro_error"]:.4e}')
     print(f'Pressure Error (p): {errors["p_error"]:.4e}\n')
@@ -56,11 +64,6 @@ def main():
     print(f'Added Pointwise Error: {errors["added_error"]:.4e}')
     print(f'Multiplied Pointwise Error: {errors["multiplied_error"]:.4e}\n')
 
-    # Load the exact solution from the file
-    exact_data = np.loadtxt(file_path, delimiter='\t', skiprows=1)
-    x_exact, ro_exact, p_exact = exact_data[:, 0], exact_data[:, 1], exact_data[:, 2]
-    vx_exact = exact_data[:,3]
-
     # Plot the calculated non-dimensional parameters to show the flow solution
     for n,name in enumerate(fieldnames):
 
@@ -71,14 +74,14 @@ def main():
         ax.set_aspect('equal',adjustable='box')
  
         # Plot the quantity against x for t =0.2s and 0.0s
-        ax.plot(g['x'][:,j_pos],g[name][:,j_pos],label='t=0.2s',color='blue')
+        ax.plot(g['x'][:,j_pos],g[name][:,j_pos],label=f't={t}s',color='blue')
         if name == 'ro_ratio':
             t0 = np.ones(g['ni'])
             t0[(g['ni']//2):g['ni']] *= 0.125
             exact = ro_exact
         if name == 'v_ratio':
             t0 = np.zeros(g['ni'])
-            exact = vx_exact/0.89095233
+            exact = vx_exact/v_star
         if name == 'p':
             t0 = np.ones(g['ni'])
             t0[(g['ni']//2):g['ni']] *= 0.1
@@ -46,43 +46,162 @@ def calc_secondary(av,b):
 
 ################################################################################
 
-def calc_sod_error(g, exact_file, j_pos):
+def calc_sod_exact(x, t, gam=1.4, x0=0.5, left=[1.0,0.0,1.0], 
+    right=[0.125,0.0,0.1]):
+
+    '''
+    Exact solution of the Riemann problem for a shock tube, by default the Sod
+    problem solved by the 4A2 solver.
+    
+    Parameters:
+        x (array): Positions to sample the solution at.
+        t (float or array): Times to sample the solution at, broadcast against
+            x so a column of times, e.g. t[:,None], gives every position at 
+            every time.
+        gam (float): Ratio of specific heats.
+        x0 (float): Position of the diaphragm at t = 0.
+        left, right (list): Initial [ro, vx, p] either side of the diaphragm.
+        
+    Returns:
+        dict: Dictionary containing 'ro', 'vx' and 'p', with the broadcast 
+            shape of x and t, and the star region values 'p_star', 'vx_star'.
+    '''
+
+    # Initial states and speeds of sound either side of the diaphragm
+    ro_l, vx_l, p_l = left; ro_r, vx_r, p_r = right;
+    a_l = np.sqrt(gam * p_l / ro_l); a_r = np.sqrt(gam * p_r / ro_r);
+    gp1 = gam + 1; gm1 = gam - 1;
+
+    # Pressure function of a single wave and its derivative, a shock if the
+    # star pressure is higher than the initial state and a rarefaction if not
+    def f_wave(p, ro_k, p_k, a_k):
+        A = 2 / (gp1 * ro_k); B = gm1 / gp1 * p_k;
+        shock = p > p_k; q = np.sqrt(A / (p + B));
+        f = np.where(shock, (p - p_k) * q, 
+            2 * a_k / gm1 * ((p / p_k)**(gm1 / (2 * gam)) - 1))
+        df = np.where(shock, q * (1 - (p - p_k) / (2 * (B + p))),
+            (p / p_k)**(-gp1 / (2 * gam)) / (ro_k * a_k))
+        return(f, df)
+
+    # Solve for the pressure in the star region with a Newton iteration from
+    # the primitive variable guess, keeping the pressure positive
+    p = 0.5 * (p_l + p_r) - 0.125 * (vx_r - vx_l) * (ro_l + ro_r) * (a_l + a_r)
+    p = np.maximum(p, 1e-8)
+    for n in range(50):
+        f_l, df_l = f_wave(p, ro_l, p_l, a_l)
+        f_r, df_r = f_wave(p, ro_r, p_r, a_r)
+        p_new = np.maximum(p - (f_l + f_r + vx_r - vx_l) / (df_l + df_r), 1e-8)
+        change = np.max(2 * np.abs(p_new - p) / (p_new + p))
+        p = p_new
+        if change < 1e-12:
+            break
+    f_l, _ = f_wave(p, ro_l, p_l, a_l)
+    f_r, _ = f_wave(p, ro_r, p_r, a_r)
+    p_star = p; vx_star = 0.5 * (vx_l + vx_r) + 0.5 * (f_r - f_l);
+
+    # Similarity variable, at t = 0 every point is either side of the diaphragm
+    with np.errstate(divide='ignore', invalid='ignore'):
+        xi = (np.asarray(x, dtype=float) - x0) / np.asarray(t, dtype=float)
+    xi = np.nan_to_num(xi, nan=0.0, posinf=np.inf, neginf=-np.inf)
+
+    # Density in the star region either side of the contact, from the shock
+    # jump conditions or the isentropic relation across a rarefaction
+    def ro_star(p_k, ro_k):
+        r = p_star / p_k
+        return(np.where(p_star > p_k, 
+            ro_k * (r + gm1 / gp1) / (gm1 / gp1 * r + 1), ro_k * r**(1 / gam)))
+
+    # Speeds of the head and tail of the waves, a shock has the same speed for
+    # both and a rarefaction fans out between them
+    def wave_speeds(p_k, ro_k, a_k, vx_k, sign):
+        s_shock = vx_k + sign * a_k * np.sqrt(gp1 / (2 * gam) * p_star / p_k + 
+            gm1 / (2 * gam))
+        a_star = a_k * (p_star / p_k)**(gm1 / (2 * gam))
+        shock = p_star > p_k
+        s_head = np.where(shock, s_shock, vx_k + sign * a_k)
+        s_tail = np.where(shock, s_shock, vx_star + sign * a_star)
+        return(s_head, s_tail)
+    sh_l, st_l = wave_speeds(p_l, ro_l, a_l, vx_l, -1)
+    sh_r, st_r = wave_speeds(p_r, ro_r, a_r, vx_r, 1)
+
+    # States inside the rarefaction fans, these are only valid between the 
+    # head and tail of each fan and are discarded everywhere else
+    with np.errstate(invalid='ignore'):
+        a_fan = 2 / gp1 * (a_l + gm1 / 2 * (vx_l - xi))
+        fan_l = [ro_l * (a_fan / a_l)**(2 / gm1), 
+            2 / gp1 * (a_l + gm1 / 2 * vx_l + xi), 
+            p_l * (a_fan / a_l)**(2 * gam / gm1)]
+        a_fan = 2 / gp1 * (a_r - gm1 / 2 * (vx_r - xi))
+        fan_r = [ro_r * (a_fan / a_r)**(2 / gm1), 
+            2 / gp1 * (-a_r + gm1 / 2 * vx_r + xi), 
+            p_r * (a_fan / a_r)**(2 * gam / gm1)]
+
+    # Select the region every point lies in, from left to right
+    regions = [xi < sh_l, xi < st_l, xi < vx_star, xi <= st_r, xi <= sh_r]
+    star_l = [ro_star(p_l, ro_l), vx_star, p_star]
+    star_r = [ro_star(p_r, ro_r), vx_star, p_star]
+    s = {'p_star': p_star, 'vx_star': vx_star}
+    for n,name in enumerate(['ro','vx','p']):
+        s[name] = np.select(regions, [left[n], fan_l[n], star_l[n], star_r[n], 
+            fan_r[n]], right[n])
+
+    return s
+
+################################################################################
+
+def calc_sod_error(g, exact, j_pos, gam=1.4):
     
     '''
     Calculate separate L2 errors for 'ro' and 'p', as well as combined errors (addition and multiplication).
     
     Parameters:
         g (dict): Dictionary containing CFD solution with keys 'x', 'ro', 'p'.
-        exact_file (str): Path to the file containing the exact solution (sod.raw).
+        exact (str, float or array): Path to the file containing the exact 
+            solution (sod.raw), or the time of the solution to calculate the 
+            exact solution directly with "calc_sod_exact". An array of times
+            scores frames stacked along the first axis of 'ro' and 'p'.
+        gam (float): Ratio of specific heats used for the exact solution.
         
     Returns:
-        dict: Dictionary containing 'ro_error', 'p_error', 'added_error', and 'multiplied_error'.
+        dict: Dictionary containing 'ro_error', 'p_error', 'added_error', and 'multiplied_error',
+            with one value per frame if the frames are stacked.
     '''
     
-    # Load the exact solution from the file
-    exact_data = np.loadtxt(exact_file, delimiter='\t', skiprows=1)
-    x_exact, ro_exact, p_exact = exact_data[:, 0], exact_data[:, 1], exact_data[:, 2]
-    
-    # Interpolate exact solution to CFD solution points
     x_cfd = np.array(g['x'][:,j_pos])
-    ro_exact_interp = np.interp(x_cfd, x_exact, ro_exact)
-    p_exact_interp = np.interp(x_cfd, x_exact, p_exact)
+    if isinstance(exact, str):
+
+        # Load the exact solution from the file
+        exact_data = np.loadtxt(exact, delimiter='\t', skiprows=1)
+        x_exact, ro_exact, p_exact = exact_data[:, 0], exact_data[:, 1], exact_data[:, 2]
+    
+        # Interpolate exact solution to CFD solution points
+        ro_exact_interp = np.interp(x_cfd, x_exact, ro_exact)
+        p_exact_interp = np.interp(x_cfd, x_exact, p_exact)
+
+    else:
+
+        # Calculate the exact solution at the CFD solution points, the 
+        # diaphragm is halfway between the two halves of the initial guess
+        i_mid = g['ni']//2
+        x0 = 0.5 * (x_cfd[i_mid-1] + x_cfd[i_mid])
+        s = calc_sod_exact(x_cfd, np.expand_dims(exact, -1), gam, x0)
+        ro_exact_interp = s['ro']; p_exact_interp = s['p'];
     
     # Extract CFD solution values
-    ro_cfd = np.array(g['ro'][:,j_pos])
-    p_cfd = np.array(g['p'][:,j_pos])
+    ro_cfd = np.array(g['ro'][...,j_pos])
+    p_cfd = np.array(g['p'][...,j_pos])
     
     # Compute separate L2 norms
-    ro_error = np.sqrt(np.mean((ro_cfd - ro_exact_interp) ** 2))
-    p_error = np.sqrt(np.mean((p_cfd - p_exact_interp) ** 2))
+    ro_error = np.sqrt(np.mean((ro_cfd - ro_exact_interp) ** 2, axis=-1))
+    p_error = np.sqrt(np.mean((p_cfd - p_exact_interp) ** 2, axis=-1))
     
     # Compute point-wise combined errors
     added_error_pointwise = np.abs(ro_cfd - ro_exact_interp) + np.abs(p_cfd - p_exact_interp)
     multiplied_error_pointwise = np.abs(ro_cfd - ro_exact_interp) * np.abs(p_cfd - p_exact_interp)
     
     # Compute L2 norms for combined errors
-    added_error = np.sqrt(np.mean(added_error_pointwise ** 2))
-    multiplied_error = np.sqrt(np.mean(multiplied_error_pointwise ** 2))
+    added_error = np.sqrt(np.mean(added_error_pointwise ** 2, axis=-1))
+    multiplied_error = np.sqrt(np.mean(multiplied_error_pointwise ** 2, axis=-1))
     
     # Return all errors in a dictionary
     return {
@@ -6,6 +6,7 @@
 
 # Import modules and functions
 import sys
+import hashlib
 import numpy as np
 import matplotlib.pyplot as plt 
 import scipy.interpolate as interp
@@ -44,6 +45,54 @@ def calc_secondary(av,b):
     return b
 
 ################################################################################
+
+# Masks of the regions of the waves case, stored for the few meshes they were
+# most recently calculated on so that runs on the same grid only classify the
+# nodes once
+waves_masks = {}; max_waves_masks = 4;
+
+def calc_waves_masks(g):
+    '''
+    Classify every node of the waves mesh against the two oblique shock lines
+
+    Parameters:
+        g (dict): Dictionary containing the mesh with keys 'x', 'y'.
+
+    Returns:
+        tuple (mask after both shocks, mask in between the two shocks),
+        all other nodes are before both shocks. The masks are shared between
+        calls so they are read-only
+    '''
+    # Identify the mesh by its coordinates, a mesh that is used again is moved
+    # to the end so the least recently used is first
+    key = hashlib.sha1(g['x'].tobytes() + g['y'].tobytes()).hexdigest()
+    if key in waves_masks:
+        waves_masks[key] = waves_masks.pop(key)
+        return waves_masks[key]
+
+    m1 = (0.1- 0.0) / (0.1497 - 0.0)
+    b1 = 0.0
+
+    m2 = (0.1 - 0.01759) / (0.1497 - 0.1254)
+    b2 = 0.01759 - m2 * 0.1254
+
+    # Compare every node with the shock lines at once, nodes lying exactly on 
+    # a line are in between the two shocks
+    y_on_line1 = m1 * g['x'] + b1
+    y_on_line2 = m2 * g['x'] + b2
+    after = (g['y'] < y_on_line1) & (g['y'] < y_on_line2)
+    before = (g['y'] > y_on_line1) & (g['y'] > y_on_line2)
+    between = ~after & ~before
+
+    # Store the masks, forgetting the least recently used if there are too many
+    after.setflags(write=False); between.setflags(write=False);
+    if len(waves_masks) >= max_waves_masks:
+        del waves_masks[next(iter(waves_masks))]
+    waves_masks[key] = (after, between)
+    return(after, between)
+
+################################################################################
+
 def calc_waves_error(av,g,p1,p01):
     '''
     Calculate separate L2 errors for 'cpstag' and 'cp'
@@ -55,39 +104,19 @@ def calc_waves_error(av,g,p1,p01):
         tuple (L2 error in cpstag, L2 error in cp)
         adds exact solution entries to g for plotting for reference
     '''
-    m1 = (0.1- 0.0) / (0.1497 - 0.0)
-    b1 = 0.0
-
-    m2 = (0.1 - 0.01759) / (0.1497 - 0.1254)
-    b2 = 0.01759 - m2 * 0.1254
-
     pstag_exact = p01
     gamma = av['gam']
     M_exact = np.sqrt((2 / (gamma - 1)) * (((p01 / p1) ** ((gamma - 1) / gamma)) - 1))
 
-    g['cp_exact'] = np.zeros_like(g['x'])
+    # Fill the exact solution in each region, before both shocks the flow is 
+    # unchanged from the inlet
+    after, between = calc_waves_masks(g)
+    cp_exact = [(p1*2.36475 - p1)/(p01 - p1), (p1*1.50217 - p1)/(p01 - p1)]
+    g['cp_exact'] = np.select([after, between], cp_exact, 
+        0).astype(g['x'].dtype)
     g['cpstag_exact'] = np.zeros_like(g['x'])
-    g['M_exact'] = np.ones_like(g['x'])*M_exact
-
-    for n in range(g['nj']):
-        for i, (x,y) in enumerate(zip(g['x'][:,n], g['y'][:,n])):
-            y_on_line1 = m1 * x + b1
-            y_on_line2 = m2 * x + b2
-
-            if y<y_on_line1 and y<y_on_line2:
-                # after both shocks
-                p_exact = p1*2.36475
-                M_exact = 1.2022102
-            elif y>y_on_line1 and y>y_on_line2:
-                # before both shocks
-                continue
-            else:
-                # in between the two shocks
-                p_exact = p1*1.50217
-                M_exact = 1.5288892
-            cp_exact = (p_exact - p1)/(p01 - p1)
-            g['M_exact'][i,n] = M_exact
-            g['cp_exact'][i,n] = cp_exact
+    g['M_exact'] = np.select([after, between], [1.2022102, 1.5288892], 
+        np.ones_like(g['x'])*M_exact)
 
     cp_error = np.linalg.norm(g['cp_exact']-g['cp'])
     cpstag_error = np.linalg.norm(g['cpstag_exact']-g['cpstag'])